@@ -0,0 +1,108 @@
+"""
+Build Pool - Run CPU-bound rack build + serialization off the event loop (thread or process pool)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+POOL_KINDS = ("thread", "process")
+
+# Never fork: workers start while build threads may hold the fragment/template/device DB locks,
+# and a forked child inheriting a held lock deadlocks on its first build
+PROCESS_START_METHOD = "spawn"
+
+
+class BuildPool:
+    """Lazily started executor with the counters /health reports.
+
+    pending counts jobs submitted and not yet finished (tracked on the executor
+    future, so a job whose caller was cancelled stays counted until the worker
+    is really done with it); queue_depth is the part of that not running yet.
+    Threads share the process's device DB and fragment cache but contend for
+    the GIL; processes build in parallel, each loading the device DB once.
+    """
+
+    def __init__(self, kind: str = "thread", workers: Optional[int] = None,
+                 initializer: Optional[Callable[[], Any]] = None, name: str = "build"):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Unknown build pool '{kind}' (expected one of: {', '.join(POOL_KINDS)})")
+        self.kind = kind
+        self.workers = max(1, workers or min(4, os.cpu_count() or 1))
+        self.initializer = initializer
+        self.name = name
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.max_queue_depth = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self._total_s = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+                    initializer=self.initializer,
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name,
+                                                    initializer=self.initializer)
+        return self._executor
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Await fn(*args) on a worker; cancelling the caller drops the job if it has not started"""
+        started = time.perf_counter()
+        future = self._get_executor().submit(fn, *args)
+        with self._lock:
+            self.submitted += 1
+            self._pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._pending - self.workers)
+        future.add_done_callback(lambda f: self._done(f, started))
+        return await asyncio.wrap_future(future)
+
+    def _done(self, future, started: float):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled():
+                self.cancelled += 1
+                return
+            self._total_s += time.perf_counter() - started
+            if future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.workers)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "started": self._executor is not None,
+                "pending": self._pending,
+                "running": min(self._pending, self.workers),
+                "queue_depth": max(0, self._pending - self.workers),
+                "max_queue_depth": self.max_queue_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "avg_ms": round(self._total_s / finished * 1000.0, 1) if finished else None,
+            }
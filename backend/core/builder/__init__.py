@@ -2,8 +2,9 @@ from .rack import AudioEffectRack
 from .chain import Chain
 from .device import AbletonDevice
 from .models import MacroMapping
-from .constants import PARAMETER_AUTHORITY, ENUM_AUTHORITY, SEMANTIC_MAP
-from .serialization import prettify_xml, save_adg
+from .constants import PARAMETER_AUTHORITY, ENUM_AUTHORITY, SEMANTIC_MAP, COMPRESSION_PROFILES
+from .serialization import prettify_xml, save_adg, write_adg, adg_bytes, resolve_compresslevel
+from .fragments import FragmentCache, DEVICE_FRAGMENT_CACHE
 
 __all__ = [
     'AudioEffectRack',
@@ -13,6 +14,12 @@ __all__ = [
     'PARAMETER_AUTHORITY',
     'ENUM_AUTHORITY',
     'SEMANTIC_MAP',
+    'COMPRESSION_PROFILES',
     'prettify_xml',
-    'save_adg'
+    'save_adg',
+    'write_adg',
+    'adg_bytes',
+    'resolve_compresslevel',
+    'FragmentCache',
+    'DEVICE_FRAGMENT_CACHE'
 ]
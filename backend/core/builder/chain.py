@@ -108,7 +108,7 @@ class Chain:
             global_preset_id = "0"
             if hasattr(device_db, "get_next_preset_id"):
                 global_preset_id = device_db.get_next_preset_id()
-            device_presets.append(device.to_preset_xml(preset_id=global_preset_id))
+            device_presets.append(device.to_preset_fragment(preset_id=global_preset_id))
             
         mixer_preset_root = ET.SubElement(branch, "MixerPreset")
         global_mixer_preset_id = "0"
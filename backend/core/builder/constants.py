@@ -3,3 +3,11 @@ from .authority import PARAMETER_AUTHORITY, SEMANTIC_MAP, ENUM_AUTHORITY
 # Global App Settings
 MAX_MACROS = 16
 DEFAULT_TEMPLATE = "template_rack.xml"
+
+# .adg gzip profiles (name -> zlib level). "max" is the historical default.
+COMPRESSION_PROFILES = {
+    "fast": 1,
+    "balanced": 6,
+    "max": 9
+}
+DEFAULT_COMPRESSION_PROFILE = "max"
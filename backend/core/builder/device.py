@@ -2,6 +2,24 @@ import xml.etree.ElementTree as ET
 from typing import List, Dict, Any, Optional
 from .authority import PARAMETER_AUTHORITY, ENUM_AUTHORITY
 from .models import MacroMapping
+from .fragments import DEVICE_FRAGMENT_CACHE, FragmentCache, preset_fragment, split_preset
+from .serialization import RawXmlFragment, serialize_element
+from ..device_mapper import normalize_device_name
+
+# V66: EQ Eight band blueprint. Untouched bands are identical in every rack, so each
+# Bands.{i} node is serialized once per process and reused verbatim.
+EQ8_BAND_COUNT = 8
+EQ8_SIDES = ("ParameterA", "ParameterB")
+_EQ8_BAND_PARAMS = ("IsOn", "Mode", "Freq", "Gain", "Q")
+# Override keys that reach band i: bare names hit every band, full paths only their own
+_EQ8_OVERRIDE_KEYS = {
+    i: frozenset(p.lower() for p in _EQ8_BAND_PARAMS) | frozenset(
+        f"bands{i}{side.lower()}{p.lower()}" for side in EQ8_SIDES for p in _EQ8_BAND_PARAMS
+    )
+    for i in range(EQ8_BAND_COUNT)
+}
+_EQ8_BAND_BLUEPRINT: Dict[int, str] = {}
+
 
 class AbletonDevice:
     """Represents a single Ableton device with full parameter support"""
@@ -13,17 +31,13 @@ class AbletonDevice:
         # Get device config from database
         self.device_info = device_db.get_device(name)
         
-        # FUZZY DB LOOKUP (V36.1)
+        # FUZZY DB LOOKUP (V36.1, V66: served from the DB name index)
         if not self.device_info:
-            target_norm = name.lower().replace(" ", "").replace("_", "").replace("-", "").replace("2", "").replace("new", "")
-            available_devices = device_db.devices.get("devices", {}).get("audio_effects", {})
-            for db_key in available_devices.keys():
-                db_norm = db_key.lower().replace(" ", "").replace("_", "").replace("-", "").replace("2", "").replace("new", "")
-                if target_norm == db_norm or target_norm in db_norm or db_norm in target_norm:
-                    self.device_info = device_db.get_device(db_key)
-                    # V64: Preserve the unique identity (don't overwrite self.name)
-                    # self.name = db_key 
-                    break
+            db_key = device_db.fuzzy_match(name)
+            if db_key:
+                self.device_info = device_db.get_device(db_key)
+                # V64: Preserve the unique identity (don't overwrite self.name)
+                # self.name = db_key 
         
         # SAFE FALLBACK LOGIC
         if not self.device_info:
@@ -46,11 +60,27 @@ class AbletonDevice:
             if not self.device_info:
                  raise ValueError(f"Critical: Fallback device '{fallback_name}' also missing!")
                  
+        # V66: Normalized once, used by the rack's device/intent matching
+        self.norm_name = normalize_device_name(self.name)
         self.xml_tag = self.device_info['xml_tag']
         self.class_name = self.device_info['class_name']
         self.type = self.device_info['type']
         self.mappings: Dict[tuple, MacroMapping] = {}
         self.parameter_overrides: Dict[str, float] = {}
+        
+        # V66: Name-keyed parameter index (first definition wins) and mapped-name set
+        self.parameter_index: Dict[str, Any] = {}
+        self.parameter_norms: List[tuple] = []
+        for param in self.device_info.get('parameters', ()):
+            p_name = param['name']
+            self.parameter_index.setdefault(p_name.lower(), param)
+            self.parameter_norms.append((p_name.lower().replace("_", "").replace(" ", "").replace("-", ""), p_name))
+        self.mapped_param_names = set()
+        
+        # V66: Identifies the merged spec for the preset fragment cache
+        self.spec_fingerprint = None
+        if hasattr(device_db, "spec_fingerprint"):
+            self.spec_fingerprint = device_db.spec_fingerprint(self.device_info)
     
     def set_initial_parameter(self, name: str, value: float):
         """Set an initial value for a parameter (Surgical Control)"""
@@ -60,6 +90,11 @@ class AbletonDevice:
 
     def add_mapping(self, param_path: List[str], mapping: MacroMapping):
         self.mappings[tuple(param_path)] = mapping
+        self.mapped_param_names.update(mapping.param_path)
+
+    def get_parameter(self, name: str) -> Optional[Any]:
+        """O(1) case-insensitive parameter metadata lookup"""
+        return self.parameter_index.get(name.lower())
 
     def _create_parameter(self, name: str, value: float, min_val: float = 0.0, max_val: float = 127.0, param_path: List[str] = []) -> ET.Element:
         """Create a full Ableton parameter element with optional macro mapping"""
@@ -150,14 +185,12 @@ class AbletonDevice:
                 # param_path arg is passed in for complex devices like Eq8
                 current_path = param_path if param_path else [name]
                 
-                # Check mappings
-                for m_path, mapping in self.mappings.items():
-                    # converting tuple to list for comparison if needed, or exact match
-                    if list(m_path) == current_path or m_path == tuple(current_path):
-                         # Map ID is index + 1 (1-based for LOM usually, but let's try 1-based integers)
-                         # Note: In Ableton XML, modulation sources correspond to their index if SourceCount > 0
-                         mapping_id = str(mapping.macro_index + 1)
-                         break
+                # Check mappings (path-keyed, exact match)
+                path_mapping = self.mappings.get(tuple(current_path))
+                if path_mapping:
+                    # Map ID is index + 1 (1-based for LOM usually, but let's try 1-based integers)
+                    # Note: In Ableton XML, modulation sources correspond to their index if SourceCount > 0
+                    mapping_id = str(path_mapping.macro_index + 1)
                          
                 mod_target.set("Id", mapping_id)
                 ET.SubElement(mod_target, "LockEnvelope").set("Value", "0")
@@ -223,23 +256,7 @@ class AbletonDevice:
         self._add_metadata_fields(device_elem, self.class_name)
 
         if self.xml_tag == "Eq8":
-            ET.SubElement(device_elem, "Precision").set("Value", "0")
-            ET.SubElement(device_elem, "Mode").set("Value", "0")
-            ET.SubElement(device_elem, "EditMode").set("Value", "false")
-            ET.SubElement(device_elem, "SelectedBand").set("Value", "0")
-            device_elem.append(self._create_parameter("GlobalGain", 0.0, -12.0, 12.0))
-            device_elem.append(self._create_parameter("Scale", 1.0, -2.0, 2.0))
-            for i in range(8):
-                band = ET.SubElement(device_elem, f"Bands.{i}")
-                for side in ["ParameterA", "ParameterB"]:
-                    p_side = ET.SubElement(band, side)
-                    # V20: Unified path tracking for surgical and macro resolution
-                    base_path = [f"Bands.{i}", side]
-                    p_side.append(self._create_parameter("IsOn", 1.0, 0, 1, base_path))
-                    p_side.append(self._create_parameter("Mode", 3, 0, 7, base_path))
-                    p_side.append(self._create_parameter("Freq", 100 * (i+1), 10, 22000, base_path))
-                    p_side.append(self._create_parameter("Gain", 0.0, -15, 15, base_path))
-                    p_side.append(self._create_parameter("Q", 0.707, 0.1, 18, base_path))
+            self._append_eq8_body(device_elem)
         else:
             self._create_generic_device_xml(device_elem)
         
@@ -261,6 +278,62 @@ class AbletonDevice:
         
         return preset
 
+    def fragment_key(self) -> Optional[tuple]:
+        """Hashable snapshot of everything to_preset_xml depends on (None = not cacheable)"""
+        if not self.spec_fingerprint:
+            return None
+        overrides = tuple(sorted((k, repr(v)) for k, v in self.parameter_overrides.items()))
+        mappings = tuple(sorted(
+            (path, m.macro_index, repr(m.min_val), repr(m.max_val)) for path, m in self.mappings.items()
+        ))
+        return (self.xml_tag, self.class_name, self.spec_fingerprint, overrides, mappings)
+
+    def to_preset_fragment(self, preset_id: str = "0", cache: FragmentCache = DEVICE_FRAGMENT_CACHE) -> ET.Element:
+        """Like to_preset_xml, but served from the serialized fragment cache when possible"""
+        key = self.fragment_key()
+        if key is None:
+            return self.to_preset_xml(preset_id=preset_id)
+        body = cache.get(key)
+        if body is None:
+            body = split_preset(self.to_preset_xml())
+            cache.put(key, body)
+        return preset_fragment(body, preset_id)
+
+    def _append_eq8_body(self, device_elem: ET.Element):
+        ET.SubElement(device_elem, "Precision").set("Value", "0")
+        ET.SubElement(device_elem, "Mode").set("Value", "0")
+        ET.SubElement(device_elem, "EditMode").set("Value", "false")
+        ET.SubElement(device_elem, "SelectedBand").set("Value", "0")
+        device_elem.append(self._create_parameter("GlobalGain", 0.0, -12.0, 12.0))
+        device_elem.append(self._create_parameter("Scale", 1.0, -2.0, 2.0))
+        for i in range(EQ8_BAND_COUNT):
+            device_elem.append(self._eq8_band(i))
+
+    def _eq8_band(self, i: int) -> ET.Element:
+        """One Bands.{i} node, served from the compiled blueprint unless surgically touched"""
+        band_key = f"Bands.{i}"
+        touched = (
+            not self.parameter_overrides.keys().isdisjoint(_EQ8_OVERRIDE_KEYS[i])
+            or any(path[0] == band_key for path in self.mappings)
+        )
+        if not touched and i in _EQ8_BAND_BLUEPRINT:
+            return RawXmlFragment(band_key, _EQ8_BAND_BLUEPRINT[i])
+
+        band = ET.Element(band_key)
+        for side in EQ8_SIDES:
+            p_side = ET.SubElement(band, side)
+            # V20: Unified path tracking for surgical and macro resolution
+            base_path = [band_key, side]
+            p_side.append(self._create_parameter("IsOn", 1.0, 0, 1, base_path))
+            p_side.append(self._create_parameter("Mode", 3, 0, 7, base_path))
+            p_side.append(self._create_parameter("Freq", 100 * (i+1), 10, 22000, base_path))
+            p_side.append(self._create_parameter("Gain", 0.0, -15, 15, base_path))
+            p_side.append(self._create_parameter("Q", 0.707, 0.1, 18, base_path))
+
+        if not touched:
+            _EQ8_BAND_BLUEPRINT[i] = serialize_element(band)
+        return band
+
     def _create_generic_device_xml(self, device_elem):
         if not self.device_info or 'parameters' not in self.device_info:
             return
@@ -268,7 +341,7 @@ class AbletonDevice:
             p_name = param['name']
             if p_name in ["Device On", "DeviceOn", "On"]:
                 continue
-            is_mapped = any(p_name in mapping.param_path for mapping in self.mappings.values())
+            is_mapped = p_name in self.mapped_param_names
             is_simple = " " not in p_name and "." not in p_name
             if not (is_mapped or is_simple or p_name in ["DryWet", "Gain", "Amount", "Drive", "Threshold"]):
                 continue
@@ -292,23 +365,7 @@ class AbletonDevice:
         ET.SubElement(device_elem, "LastSelectedClipEnvelopeIndex").set("Value", "0")
         self._add_metadata_fields(device_elem, self.class_name)
         if self.xml_tag == "Eq8":
-            ET.SubElement(device_elem, "Precision").set("Value", "0")
-            ET.SubElement(device_elem, "Mode").set("Value", "0")
-            ET.SubElement(device_elem, "EditMode").set("Value", "false")
-            ET.SubElement(device_elem, "SelectedBand").set("Value", "0")
-            device_elem.append(self._create_parameter("GlobalGain", 0.0, -12.0, 12.0))
-            device_elem.append(self._create_parameter("Scale", 1.0, -2.0, 2.0))
-            
-            for i in range(8):
-                band = ET.SubElement(device_elem, f"Bands.{i}")
-                for side in ["ParameterA", "ParameterB"]:
-                    p_side = ET.SubElement(band, side)
-                    p_path = [f"Bands.{i}", side]
-                    p_side.append(self._create_parameter("IsOn", 1.0, 0, 1, p_path))
-                    p_side.append(self._create_parameter("Mode", 3, 0, 7, p_path))
-                    p_side.append(self._create_parameter("Freq", 100 * (i+1), 10, 22000, p_path))
-                    p_side.append(self._create_parameter("Gain", 0.0, -15, 15, p_path))
-                    p_side.append(self._create_parameter("Q", 0.707, 0.1, 18, p_path))
+            self._append_eq8_body(device_elem)
         else:
             self._create_generic_device_xml(device_elem)
         return device_elem
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from .serialization import RawXmlFragment, serialize_element
+
+# Cached device presets (most racks repeat Utility / EQ Eight / Limiter)
+DEFAULT_FRAGMENT_CACHE_SIZE = 512
+PRESET_ID_PREFIX = '<AbletonDevicePreset Id="'
+
+
+class FragmentCache:
+    """Thread-safe LRU of serialized device presets, keyed by device state"""
+
+    def __init__(self, max_entries: int = DEFAULT_FRAGMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Hashable, body: str):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+
+
+DEVICE_FRAGMENT_CACHE = FragmentCache()
+
+
+def split_preset(preset_elem) -> str:
+    """Serialize an AbletonDevicePreset and drop its Id so any preset id can be patched in"""
+    xml = serialize_element(preset_elem)
+    head = f'{PRESET_ID_PREFIX}{preset_elem.get("Id")}"'
+    if not xml.startswith(head):
+        raise ValueError("Unexpected preset layout, cannot cache fragment")
+    return xml[len(head):]
+
+
+def preset_fragment(body: str, preset_id: str) -> RawXmlFragment:
+    """Rebuild a cached preset for a given preset id"""
+    return RawXmlFragment("AbletonDevicePreset", f'{PRESET_ID_PREFIX}{preset_id}"{body}')
@@ -1,11 +1,97 @@
 import xml.etree.ElementTree as ET
+import copy
 import os
-from typing import List, Dict, Optional
+import threading
+from typing import List, Dict, Optional, Union
 from .chain import Chain
 from .device import AbletonDevice
 from .models import MacroMapping
-from .serialization import prettify_xml, save_adg
+from .serialization import adg_bytes, write_adg
 from .authority import PARAMETER_AUTHORITY, SEMANTIC_MAP, SIGNAL_CHAIN_HIERARCHY
+from .constants import DEFAULT_TEMPLATE
+from ..device_mapper import normalize_device_name
+
+# Device-name fragments -> SEMANTIC_MAP key (first substring hit wins)
+SEMANTIC_ALIASES = {
+    "autofilter": "autofilter2", 
+    "eqeight": "Eq8",
+    "eq8": "Eq8",
+    "chorus": "chorus2", 
+    "autopan": "autopan2", 
+    "phaser": "phasernew", 
+    "redux": "redux2", 
+    "beatrepeat": "BeatRepeat", 
+    "spectralresonator": "SpectralResonator", 
+    "spectraltime": "Spectral",
+    "spectral": "Spectral",
+    "hybridreverb": "Hybrid",
+    "hybrid": "Hybrid",
+    "roar": "Roar",
+    "phaserflanger": "PhaserNew", 
+    "chorusensemble": "Chorus2",
+    "chorus-ensemble": "Chorus2",
+    "filterdelay": "FilterDelay"
+}
+
+# V66: SEMANTIC_MAP keyed by normalized device name, intents pre-normalized
+_SEMANTIC_INDEX = {
+    normalize_device_name(k): tuple(
+        (intent.lower().replace(" ", "").replace("/", "").replace("_", "").replace("-", ""), real_param)
+        for intent, real_param in v.items()
+    )
+    for k, v in reversed(list(SEMANTIC_MAP.items()))
+}
+# Device names come from the client/LLM ("My Chorus (3)"...): memoize hits only, newest SEMANTIC_CACHE_MAX
+SEMANTIC_CACHE_MAX = 1024
+_SEMANTIC_LOOKUP_CACHE: Dict[str, tuple] = {}
+_SEMANTIC_LOOKUP_LOCK = threading.Lock()
+
+
+def _semantic_intents_for(device_norm: str) -> tuple:
+    """Resolve a normalized device name to its (intent_norm, real_param) pairs (hits memoized)"""
+    cached = _SEMANTIC_LOOKUP_CACHE.get(device_norm)
+    if cached is not None:
+        return cached
+    s_key = device_norm
+    for a_k, a_v in SEMANTIC_ALIASES.items():
+        if a_k in s_key: s_key = a_v; break
+    intents = _SEMANTIC_INDEX.get(s_key, ())
+    if intents:
+        with _SEMANTIC_LOOKUP_LOCK:
+            if len(_SEMANTIC_LOOKUP_CACHE) >= SEMANTIC_CACHE_MAX:
+                _SEMANTIC_LOOKUP_CACHE.pop(next(iter(_SEMANTIC_LOOKUP_CACHE)), None)
+            _SEMANTIC_LOOKUP_CACHE[device_norm] = intents
+    return intents
+
+
+_TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", DEFAULT_TEMPLATE)
+_TEMPLATE_SKELETON: Optional[ET.Element] = None
+_TEMPLATE_LOCK = threading.Lock()
+
+
+def _get_template_skeleton() -> ET.Element:
+    """Parse template_rack.xml once per process and strip it down to a reusable skeleton.
+
+    The returned tree is shared: callers must deepcopy it before modifying.
+    """
+    global _TEMPLATE_SKELETON
+    if _TEMPLATE_SKELETON is None:
+        with _TEMPLATE_LOCK:
+            if _TEMPLATE_SKELETON is None:
+                root = ET.parse(_TEMPLATE_PATH).getroot()
+                gp = root.find("GroupDevicePreset"); rack = gp.find("Device/AudioEffectGroupDevice")
+                mod_count = rack.find("ModulationSourceCount")
+                if mod_count is not None: mod_count.set("Value", "16")
+                branches_elem = rack.find("Branches")
+                if branches_elem is not None:
+                    for child in list(branches_elem): branches_elem.remove(child)
+                bp_list = gp.find("BranchPresets")
+                if bp_list is None: bp_list = ET.SubElement(gp, "BranchPresets")
+                else:
+                    for child in list(bp_list): bp_list.remove(child)
+                _TEMPLATE_SKELETON = root
+    return _TEMPLATE_SKELETON
+
 
 class AudioEffectRack:
     """Main class for building an Audio Effect Rack - Orchestrator (Modular)"""
@@ -64,12 +150,12 @@ class AudioEffectRack:
         surgical_devices = nlp_resp.get("surgical_devices", [])
         configured_instances = set()
         for s_dev in surgical_devices:
-            dev_name = str(s_dev.get("name", "")).lower().replace(" ", "").replace("-", "").replace("_", "")
+            dev_name = normalize_device_name(s_dev.get("name", ""))
             params = s_dev.get("parameters", {})
             for chain in self.chains:
                 for device in chain.devices:
                     if device in configured_instances: continue
-                    d_norm = device.name.lower().replace(" ", "").replace("-", "").replace("_", "")
+                    d_norm = device.norm_name
                     if dev_name in d_norm or d_norm in dev_name:
                         for p_name, p_val in params.items():
                             # V20: Translate 1-indexed surgical paths (Bands.1.X) to 0-indexed internal paths
@@ -106,7 +192,7 @@ class AudioEffectRack:
         # Phase 1: Resolution
         for item in plan:
             # V64: Consistent normalization for naming resolution
-            raw_target_dev = str(item.get("target_device") or "").lower().replace(" ", "").replace("_", "").replace("-", "").replace("(", "").replace(")", "")
+            raw_target_dev = normalize_device_name(item.get("target_device") or "")
             target_param = str(item.get("target_parameter") or "").lower()
             if not raw_target_dev or not target_param: continue
 
@@ -114,7 +200,7 @@ class AudioEffectRack:
             for chain in self.chains:
                 for device in chain.devices:
                     # Normalize names for fuzzy matching (V64: Improved numbering handle)
-                    d_norm = device.name.lower().replace(" ", "").replace("_", "").replace("-", "").replace("(", "").replace(")", "")
+                    d_norm = device.norm_name
                     if raw_target_dev in d_norm or d_norm in raw_target_dev:
                         best_p, best_path, min_v, max_v = self._resolve_parameter_for_device(device, target_param)
                         if not best_p: continue
@@ -191,7 +277,7 @@ class AudioEffectRack:
             macro_label = group[0]["name"]
             for c in group:
                 dev = c["device"]; p_name = c["param"]; p_path = c["path"]
-                p_meta = next((p for p in dev.device_info.get("parameters", []) if p["name"].lower() == p_name.lower()), None)
+                p_meta = dev.get_parameter(p_name)
                 min_val, max_val = self._interpret_parameter_range(p_name, c["min"], c["max"], p_meta, p_path)
                 
                 mapping = MacroMapping(macro_index=m_idx, device_id=dev.device_id, param_path=p_path + [p_name], min_val=min_val, max_val=max_val, label=macro_label)
@@ -245,38 +331,10 @@ class AudioEffectRack:
                 if best_param: return best_param, best_path, min_v, max_v
 
         # 2. Semantic Map
-        s_key = device.name.lower().replace(" ", "").replace("_", "").replace("-", "")
-        alias_map = {
-            "autofilter": "autofilter2", 
-            "eqeight": "Eq8",
-            "eq8": "Eq8",
-            "chorus": "chorus2", 
-            "autopan": "autopan2", 
-            "phaser": "phasernew", 
-            "redux": "redux2", 
-            "beatrepeat": "BeatRepeat", 
-            "spectralresonator": "SpectralResonator", 
-            "spectraltime": "Spectral",
-            "spectral": "Spectral",
-            "hybridreverb": "Hybrid",
-            "hybrid": "Hybrid",
-            "roar": "Roar",
-            "phaserflanger": "PhaserNew", 
-            "chorusensemble": "Chorus2",
-            "chorus-ensemble": "Chorus2",
-            "filterdelay": "FilterDelay"
-        }
-        for a_k, a_v in alias_map.items():
-            if a_k in s_key: s_key = a_v; break
-        
-        device_semantic = {}
-        for k, v in SEMANTIC_MAP.items():
-            if k.lower().replace(" ", "").replace("_", "").replace("-", "") == s_key:
-                device_semantic = v; break
+        device_semantic = _semantic_intents_for(device.norm_name)
 
         target_norm = target_param.lower().replace(" ", "").replace("/", "").replace("_", "").replace("-", "")
-        for intent, real_param in device_semantic.items():
-            intent_norm = intent.lower().replace(" ", "").replace("/", "").replace("_", "").replace("-", "")
+        for intent_norm, real_param in device_semantic:
             if intent_norm == target_norm or intent_norm in target_norm:
                 best_param = real_param; best_path = []; break
         
@@ -295,9 +353,7 @@ class AudioEffectRack:
         # 4. Device Metadata Fuzzy Match (Enhanced V63)
         if not best_param:
             t_norm = target_param.lower().replace("_", "").replace(" ", "").replace("-", "")
-            for p in device.device_info.get("parameters", []):
-                p_name = p["name"]
-                p_norm = p_name.lower().replace("_", "").replace(" ", "").replace("-", "")
+            for p_norm, p_name in device.parameter_norms:
                 if t_norm == p_norm or t_norm in p_norm or p_norm in t_norm:
                     best_param = p_name; best_path = []; break
                     
@@ -460,20 +516,12 @@ class AudioEffectRack:
 
     def to_xml(self) -> ET.Element:
         """Preserved XML logic."""
-        template_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "template_rack.xml")
-        tree = ET.parse(template_path); root = tree.getroot()
+        # V66: Copy of the per-process template skeleton (Branches/BranchPresets already emptied)
+        root = copy.deepcopy(_get_template_skeleton())
         gp = root.find("GroupDevicePreset"); rack = gp.find("Device/AudioEffectGroupDevice")
-        mod_count = rack.find("ModulationSourceCount")
-        if mod_count is not None: mod_count.set("Value", "16")
         num_macros = rack.find("NumVisibleMacroControls")
         if num_macros is not None: num_macros.set("Value", str(self.macro_count))
-        branches_elem = rack.find("Branches")
-        if branches_elem is not None:
-            for child in list(branches_elem): branches_elem.remove(child)
         bp_list = gp.find("BranchPresets")
-        if bp_list is None: bp_list = ET.SubElement(gp, "BranchPresets")
-        else:
-            for child in list(bp_list): bp_list.remove(child)
         for i, chain in enumerate(self.chains):
             # V64 REVERT: Populating ONLY BranchPresets (Persistent Data)
             # Populating 'Branches' causes load failure (Forbidden Icon) in saved files.
@@ -487,7 +535,11 @@ class AudioEffectRack:
                 dn.set("Value", val)
         return root
 
-    def save(self, filepath: str):
-        xml_tree = self.to_xml()
-        xml_string = prettify_xml(xml_tree)
-        save_adg(xml_string, filepath)
+    def save(self, filepath: str, compression: Optional[Union[str, int]] = None):
+        """Write the rack as .adg; compression is a profile name ('fast'/'balanced'/'max') or zlib level"""
+        # V66: Streamed straight into the gzip file (see serialization.write_adg)
+        write_adg(self.to_xml(), filepath, compression=compression)
+
+    def to_adg_bytes(self, filename: str, compression: Optional[Union[str, int]] = None) -> bytes:
+        """The .adg file content save() would write for filename (gzip header carries its name)"""
+        return adg_bytes(self.to_xml(), filename, compression=compression)
@@ -1,47 +1,168 @@
 import xml.etree.ElementTree as ET
 import os
 import gzip
+import io
+from typing import Optional, Union
+from .constants import COMPRESSION_PROFILES, DEFAULT_COMPRESSION_PROFILE
+
+# Header and root are hardcoded to match confirmed working files
+# NOTE: In V35.2, we must ensure 'Ableton' root tag is formatted EXACTLY
+# because ET.tostring alphabetizes attributes which causes load failure.
+# Targeting Ableton 12.2.5 (Build 12203)
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>'
+ROOT_TAG = '<Ableton MajorVersion="5" MinorVersion="12.0_12203" SchemaChangeCount="3" Creator="Ableton Live 12.2.5" Revision="174fd107af43e88065794fb882063fd27e80439a">'
+
+# Text handed to the gzip stream in chunks of roughly this many characters
+_STREAM_CHUNK = 64 * 1024
+
+
+def _escape_attrib(text: str) -> str:
+    # Same escaping as ElementTree so streamed output matches ET.tostring byte for byte
+    if "&" in text: text = text.replace("&", "&amp;")
+    if "<" in text: text = text.replace("<", "&lt;")
+    if ">" in text: text = text.replace(">", "&gt;")
+    if "\"" in text: text = text.replace("\"", "&quot;")
+    if "\r" in text: text = text.replace("\r", "&#13;")
+    if "\n" in text: text = text.replace("\n", "&#10;")
+    if "\t" in text: text = text.replace("\t", "&#09;")
+    return text
+
+
+def _escape_cdata(text: str, newline: str) -> str:
+    if "&" in text: text = text.replace("&", "&amp;")
+    if "<" in text: text = text.replace("<", "&lt;")
+    if ">" in text: text = text.replace(">", "&gt;")
+    if newline != "\n":
+        text = text.replace("\r", "").replace("\n", newline)
+    return text
+
+
+class RawXmlFragment(ET.Element):
+    """Placeholder element carrying already-serialized XML for the streaming writer.
+
+    Only write_ableton_xml/prettify_xml/write_adg understand it, ET.tostring
+    would emit an empty tag instead of the payload.
+    """
+
+    def __init__(self, tag: str, xml: str):
+        super().__init__(tag)
+        self.xml = xml
+
+
+def serialize_element(elem: ET.Element) -> str:
+    """Serialize a single element (no header) exactly as it appears inside a rack"""
+    parts = []
+    _serialize_element(parts.append, elem, "\n")
+    return "".join(parts)
+
+
+def _serialize_element(write, elem: ET.Element, newline: str):
+    """Walk one element in document order, Ableton style self-closing tags"""
+    if isinstance(elem, RawXmlFragment):
+        write(elem.xml if newline == "\n" else elem.xml.replace("\r", "").replace("\n", newline))
+        if elem.tail: write(_escape_cdata(elem.tail, newline))
+        return
+    tag = elem.tag
+    write("<" + tag)
+    for key, value in elem.items():
+        write(f' {key}="{_escape_attrib(value)}"')
+    text = elem.text
+    if text or len(elem):
+        write(">")
+        if text: write(_escape_cdata(text, newline))
+        for child in elem:
+            _serialize_element(write, child, newline)
+        write(f"</{tag}>")
+    else:
+        # ET writes ' />' and the V20 cleanup pass widened it again: shipped racks carry '  />'
+        write("  />")
+    if elem.tail: write(_escape_cdata(elem.tail, newline))
+
+
+def write_ableton_xml(elem: ET.Element, write, newline: str = "\n"):
+    """Serialize an Ableton document tree through write(str) without building the full string"""
+    # 1. Hardcoded header and root tag (V20 Forensic Model: native newline and tab)
+    write(f"{XML_HEADER}{newline}{ROOT_TAG}{newline}\t")
+
+    # 2. Body starts at the first GroupDevicePreset, anything before it is dropped
+    children = list(elem)
+    start = next((i for i, child in enumerate(children) if child.tag == "GroupDevicePreset"), len(children))
+    for child in children[start:]:
+        _serialize_element(write, child, newline)
+    write("</Ableton>")
+
 
 def prettify_xml(elem):
     """Return an XML string with character-perfect Ableton 12.3 formatting"""
-    # Header and root are hardcoded to match confirmed working files
-    header = '<?xml version="1.0" encoding="UTF-8"?>'
-    
-    # Extract root tag and body manually
-    # NOTE: In V35.2, we must ensure 'Ableton' root tag is formatted EXACTLY
-    # because ET.tostring alphabetizes attributes which causes load failure.
-    
-    raw_xml = ET.tostring(elem, encoding='utf-8').decode('utf-8')
-    
-    # 1. Identify the first child of the root node (GroupDevicePreset)
-    start_pos = raw_xml.find('<GroupDevicePreset')
-    final_body = raw_xml[start_pos:]
-    
-    # 2. Hardcoded root tag to ensure exact match with verified working template
-    # Targeting Ableton 12.2.5 (Build 12203)
-    root_tag = '<Ableton MajorVersion="5" MinorVersion="12.0_12203" SchemaChangeCount="3" Creator="Ableton Live 12.2.5" Revision="174fd107af43e88065794fb882063fd27e80439a">'
-    
-    # 3. Concatenate with native newline and tab (V20 Forensic Model)
-    # This precisely matches native Ableton 12 save structure
-    xml_output = f'{header}\n{root_tag}\n\t{final_body}'
-    
-    # 4. Final character cleanup: space before self-closing tags
-    xml_output = xml_output.replace('/>', ' />')
-    
-    return xml_output
-
-def save_adg(xml_string: str, filepath: str):
+    parts = []
+    write_ableton_xml(elem, parts.append)
+    return "".join(parts)
+
+
+def resolve_compresslevel(compression: Optional[Union[str, int]] = None) -> int:
+    """Map a profile name ('fast', 'balanced', 'max') or a raw zlib level to a gzip level"""
+    if compression is None:
+        compression = DEFAULT_COMPRESSION_PROFILE
+    if isinstance(compression, str) and not compression.strip().isdigit():
+        key = compression.strip().lower()
+        if key not in COMPRESSION_PROFILES:
+            raise ValueError(f"Unknown compression profile '{compression}' (expected one of {', '.join(COMPRESSION_PROFILES)})")
+        return COMPRESSION_PROFILES[key]
+    level = int(compression)
+    if not 0 <= level <= 9:
+        raise ValueError(f"Compression level must be between 0 and 9, got {level}")
+    return level
+
+
+def _open_adg(filepath: str, fileobj, compresslevel: int = 9) -> gzip.GzipFile:
+    # FNAME flag set (via filename arg) to match 'afternoon' success files
+    # We use the filename without extension or hash to keep it clean
+    fname = os.path.basename(filepath).split('_')[0]
+    return gzip.GzipFile(filename=fname, mode='wb', fileobj=fileobj, compresslevel=compresslevel, mtime=0)
+
+
+def save_adg(xml_string: str, filepath: str, compression: Optional[Union[str, int]] = None):
     """Save rack as .adg file with character-perfect structural integrity"""
     # Standardize line endings to CRLF for Windows/Ableton 12.3
     xml_string = xml_string.replace('\r', '').replace('\n', '\r\n').strip()
-    
-    # Compress with gzip 
-    # FNAME flag set (via filename arg) to match 'afternoon' success files
+
+    # Compress with gzip
     with open(filepath, 'wb') as f:
-        # We use the filename without extension or hash to keep it clean
-        fname = os.path.basename(filepath).split('_')[0]
-        with gzip.GzipFile(filename=fname, mode='wb', fileobj=f, compresslevel=9, mtime=0) as gz:
+        with _open_adg(filepath, f, resolve_compresslevel(compression)) as gz:
             gz.write(xml_string.encode('utf-8'))
-    
+
     # Silent in V38 Industrial context
     # print(f"SUCCESS: Saved V35 'Golden DNA' Rack (Modular): {filepath}")
+
+
+def _stream_adg(elem: ET.Element, gz: gzip.GzipFile):
+    pending = []
+    size = 0
+
+    def write(chunk: str):
+        nonlocal size
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= _STREAM_CHUNK:
+            gz.write("".join(pending).encode('utf-8'))
+            pending.clear()
+            size = 0
+
+    write_ableton_xml(elem, write, newline="\r\n")
+    gz.write("".join(pending).encode('utf-8'))
+
+
+def write_adg(elem: ET.Element, filepath: str, compression: Optional[Union[str, int]] = None):
+    """Stream a rack tree straight into a gzip .adg (CRLF, no intermediate document copies)"""
+    compresslevel = resolve_compresslevel(compression)
+    with open(filepath, 'wb') as f:
+        with _open_adg(filepath, f, compresslevel) as gz:
+            _stream_adg(elem, gz)
+
+
+def adg_bytes(elem: ET.Element, filename: str, compression: Optional[Union[str, int]] = None) -> bytes:
+    """Same bytes write_adg would put in filename, kept in memory (content hashing, caching)"""
+    buffer = io.BytesIO()
+    with _open_adg(filename, buffer, resolve_compresslevel(compression)) as gz:
+        _stream_adg(elem, gz)
+    return buffer.getvalue()
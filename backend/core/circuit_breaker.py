@@ -0,0 +1,91 @@
+"""
+Circuit Breaker - Route around the LLM while its latency is above the SLO
+"""
+
+import itertools
+import statistics
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyCircuitBreaker:
+    """Latency-SLO breaker: closed -> open (median of recent calls over SLO) -> half-open probe.
+
+    Failures and deadline misses are recorded as calls that took the full budget.
+    While open, callers go straight to the fallback; after the cooldown a single
+    probe call is let through and its latency decides whether to close again.
+    allow() hands out tickets: only the probe's own ticket can settle or release it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, slo_seconds: float = 20.0, window: int = 20, min_samples: int = 5,
+                 cooldown_seconds: float = 60.0):
+        self.slo_seconds = slo_seconds
+        self.min_samples = min_samples
+        self.cooldown_seconds = cooldown_seconds
+        self._latencies = deque(maxlen=window)
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._tickets = itertools.count(1)
+        self._probe_ticket: Optional[int] = None
+        self.trips = 0
+        self.short_circuits = 0
+
+    def allow(self) -> Optional[int]:
+        """Ticket if the caller may try the LLM now (pass it to record/release_probe), None = use the fallback"""
+        ticket = next(self._tickets)
+        if self.state == self.CLOSED:
+            return ticket
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and self._probe_ticket is None:
+            self._probe_ticket = ticket
+            return ticket
+        self.short_circuits += 1
+        return None
+
+    def record(self, latency: float, ok: bool = True, ticket: Optional[int] = None):
+        if not ok:
+            latency = max(latency, self.slo_seconds * 2)
+        if self.state == self.HALF_OPEN and ticket is not None and ticket == self._probe_ticket:
+            self._probe_ticket = None
+            if latency <= self.slo_seconds:
+                print(f"V66: LLM latency back under SLO ({latency:.1f}s), closing circuit")
+                self.state = self.CLOSED
+                self._latencies.clear()
+            else:
+                self._open()
+            return
+        self._latencies.append(latency)
+        if (self.state == self.CLOSED and len(self._latencies) >= self.min_samples
+                and statistics.median(self._latencies) > self.slo_seconds):
+            self._open()
+
+    def release_probe(self, ticket: Optional[int]):
+        """Probe ended without a usable measurement (e.g. cancelled), let the next call try.
+
+        No-op unless ticket is the probe's own: other callers cannot free it.
+        """
+        if ticket is not None and ticket == self._probe_ticket:
+            self._probe_ticket = None
+
+    def _open(self):
+        if self.state != self.OPEN:
+            self.trips += 1
+            print(f"Warning: LLM latency above {self.slo_seconds}s SLO, routing to fallback for {self.cooldown_seconds}s")
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_ticket = None
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "slo_seconds": self.slo_seconds,
+            "median_latency": round(statistics.median(self._latencies), 3) if self._latencies else None,
+            "trips": self.trips,
+            "short_circuits": self.short_circuits,
+        }
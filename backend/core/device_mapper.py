@@ -2,9 +2,66 @@
 Device Database - Maps device names to XML structure and parameters
 """
 
+import hashlib
 import json
 import os
-from typing import Dict, List, Optional
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# V66: Bump whenever the snapshot layout or the merge rules below change
+REGISTRY_SNAPSHOT_VERSION = 1
+REGISTRY_SNAPSHOT_NAME = "device_registry.snapshot.json"
+
+# V44 SURGICAL INTELLIGENCE: Virtual Parameters (Sidechain / Advanced Controls)
+VIRTUAL_PARAMETERS = {
+    "AutoFilter2": [
+        {"name": "Sidechain_Gain", "default": 1.0, "min": 0.0, "max": 10.0},
+        {"name": "Sidechain_Mix", "default": 1.0, "min": 0.0, "max": 1.0}
+    ],
+    "Compressor2": [
+        {"name": "Sidechain_Gain", "default": 1.0, "min": 0.0, "max": 10.0},
+        {"name": "Sidechain_Mix", "default": 1.0, "min": 0.0, "max": 1.0}
+    ],
+    "Gate": [
+        {"name": "Sidechain_Gain", "default": 1.0, "min": 0.0, "max": 10.0},
+        {"name": "Sidechain_Mix", "default": 1.0, "min": 0.0, "max": 1.0}
+    ],
+    "BeatRepeat": [
+        {"name": "Variation", "default": 0.0, "min": 0.0, "max": 10.0},
+        {"name": "Mix_Mode", "default": 0.0, "min": 0.0, "max": 2.0}
+    ]
+}
+
+# Extracted parameters that must never be merged into a spec
+MERGE_BLACKLIST = {"LegacyGain", "BranchSelectorRange", "WarpWait", "LaunchWait"}
+
+_UNRESOLVED = object()
+
+# Memoized loose spellings per DeviceDatabase (fuzzy_match)
+FUZZY_CACHE_MAX = 1024
+
+# V66: One normalization rule for every device-name lookup (spaces, separators, numbering parens)
+_NAME_STRIP_TABLE = str.maketrans("", "", " _-()/.")
+
+
+def normalize_device_name(name: str) -> str:
+    """Lowercase and strip punctuation so 'Auto-Filter (2)' and 'autofilter2' compare equal"""
+    return str(name).lower().translate(_NAME_STRIP_TABLE)
+
+
+def _fuzzy_device_key(name: str) -> str:
+    # V36.1 fuzzy form: also ignore legacy version suffixes ("2", "new")
+    return normalize_device_name(name).replace("2", "").replace("new", "")
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively turn dicts/lists into read-only mappings/tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
 
 
 class DeviceDatabase:
@@ -23,20 +80,21 @@ class DeviceDatabase:
         self.devices_dir = os.path.join(
             os.path.dirname(__file__), '..', 'data', 'devices'
         )
-        self.devices = self._load_database()
-        self.extracted_params = self._load_extracted()
-        self.cloned_dna = self._load_cloned_dna()
+        self.snapshot_path = os.path.join(
+            os.path.dirname(__file__), '..', 'data', REGISTRY_SNAPSHOT_NAME
+        )
         
-        # Ensure hierarchy exists
-        if "devices" not in self.devices: self.devices["devices"] = {}
-        if "audio_effects" not in self.devices["devices"]: self.devices["devices"]["audio_effects"] = {}
+        # V66: Resolved specs are merged once, frozen and shared (name -> canonical -> spec)
+        self._spec_cache: Dict[str, Mapping] = {}
+        self._spec_lookup: Dict[str, Optional[str]] = {}
+        self._suggestion_cache: Dict[str, Sequence[Mapping]] = {}
+        self._spec_fingerprints: Dict[int, str] = {}
+        self._spec_lock = threading.Lock()
+        # Called after rebuild_snapshot() so consumers (NLP parser prompt/caches) drop derived state
+        self._reload_listeners: List[Callable[[], None]] = []
         
-        audio_effects = self.devices["devices"]["audio_effects"]
-        
-        # Priority 1: Cloned DNA (Most accurate Physical Ranges)
-        if self.cloned_dna:
-            for d_name, d_info in self.cloned_dna.items():
-                audio_effects[d_name] = d_info
+        # V66: Single-read cold start from the compiled registry snapshot
+        self._apply_registry(self._load_registry())
         
         # Device name aliases for NLP
         self.aliases = {
@@ -247,6 +305,189 @@ class DeviceDatabase:
             }
         }
 
+        self._build_name_index()
+
+    def _registry_sources(self) -> Dict[str, str]:
+        """Source files the registry snapshot is compiled from (key -> path)"""
+        sources = {
+            "extracted_parameters.json": self.extracted_path,
+            "cloned_devices_dna.json": self.cloned_dna_path,
+        }
+        if os.path.exists(self.devices_dir):
+            for filename in sorted(os.listdir(self.devices_dir)):
+                if filename.endswith(".json"):
+                    sources[f"devices/{filename}"] = os.path.join(self.devices_dir, filename)
+        return {k: v for k, v in sources.items() if os.path.exists(v)}
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def _fingerprint_sources(self, sources: Dict[str, str], known: Optional[Dict] = None) -> Dict[str, Dict]:
+        """Stat every source; only re-hash the ones whose mtime/size moved"""
+        known = known or {}
+        fingerprints = {}
+        for key, path in sources.items():
+            st = os.stat(path)
+            prev = known.get(key)
+            if prev and prev.get("mtime_ns") == st.st_mtime_ns and prev.get("size") == st.st_size:
+                sha = prev["sha256"]
+            else:
+                sha = self._hash_file(path)
+            fingerprints[key] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": sha}
+        return fingerprints
+
+    @staticmethod
+    def _registry_digest(fingerprints: Dict[str, Dict]) -> str:
+        h = hashlib.sha256(f"v{REGISTRY_SNAPSHOT_VERSION}".encode())
+        for key in sorted(fingerprints):
+            h.update(f"{key}:{fingerprints[key]['sha256']}".encode())
+        return h.hexdigest()[:16]
+
+    def _load_registry(self) -> Dict:
+        """Load the compiled registry snapshot, rebuilding it when a source changed"""
+        sources = self._registry_sources()
+        
+        snapshot = None
+        try:
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable registry snapshot: {e}")
+        
+        if snapshot and snapshot.get("version") == REGISTRY_SNAPSHOT_VERSION:
+            known = snapshot.get("sources", {})
+            if set(known) == set(sources):
+                fingerprints = self._fingerprint_sources(sources, known)
+                if all(fingerprints[k]["sha256"] == known[k]["sha256"] for k in sources):
+                    # Touched but identical sources: refresh mtimes so the next start skips hashing
+                    if fingerprints != known:
+                        snapshot["sources"] = fingerprints
+                        self._write_snapshot(snapshot)
+                    print(f"V66: Loaded {len(snapshot['devices']['devices']['audio_effects'])} devices from registry snapshot.")
+                    return snapshot
+        
+        return self._compile_registry(sources)
+
+    def _compile_registry(self, sources: Optional[Dict[str, str]] = None) -> Dict:
+        """Build the registry from the raw JSON sources and persist it as a snapshot"""
+        sources = sources if sources is not None else self._registry_sources()
+        fingerprints = self._fingerprint_sources(sources)
+        
+        devices = self._load_database()
+        extracted = self._load_extracted()
+        cloned_dna = self._load_cloned_dna()
+        
+        # Ensure hierarchy exists
+        if "devices" not in devices: devices["devices"] = {}
+        if "audio_effects" not in devices["devices"]: devices["devices"]["audio_effects"] = {}
+        
+        audio_effects = devices["devices"]["audio_effects"]
+        
+        # Priority 1: Cloned DNA (Most accurate Physical Ranges)
+        if cloned_dna:
+            for d_name, d_info in cloned_dna.items():
+                audio_effects[d_name] = d_info
+        
+        snapshot = {
+            "version": REGISTRY_SNAPSHOT_VERSION,
+            "digest": self._registry_digest(fingerprints),
+            "sources": fingerprints,
+            "devices": devices,
+            "extracted": extracted,
+            "cloned_dna_keys": list(cloned_dna.keys()),
+        }
+        self._write_snapshot(snapshot)
+        return snapshot
+
+    def _write_snapshot(self, snapshot: Dict):
+        """Atomically replace the snapshot (several workers may race on startup)"""
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            print(f"Warning: Could not write registry snapshot: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _apply_registry(self, registry: Dict):
+        self.devices = registry["devices"]
+        self.extracted_params = registry["extracted"]
+        audio_effects = self.devices["devices"]["audio_effects"]
+        self.cloned_dna = {k: audio_effects[k] for k in registry["cloned_dna_keys"] if k in audio_effects}
+        self.registry_version = registry["digest"]
+        with self._spec_lock:
+            self._spec_cache.clear()
+            self._spec_lookup.clear()
+            self._suggestion_cache.clear()
+            self._spec_fingerprints.clear()
+
+    def rebuild_snapshot(self) -> str:
+        """Force a recompile of the registry snapshot and reload it, returns the new registry version"""
+        self._apply_registry(self._compile_registry())
+        self._build_name_index()
+        for listener in list(self._reload_listeners):
+            listener()
+        return self.registry_version
+
+    def add_reload_listener(self, callback: Callable[[], None]):
+        """Register a callback run after the registry is reloaded"""
+        self._reload_listeners.append(callback)
+
+    def _build_name_index(self):
+        """Precompute every name form (aliases, keys, xml_tags) -> canonical device key"""
+        audio_effects = self.devices.get("devices", {}).get("audio_effects", {})
+        
+        # Exact (case-insensitive) forms: aliases win, then the first key with that spelling
+        exact = dict(self.aliases)
+        for k in audio_effects.keys():
+            exact.setdefault(k.lower(), k)
+        self._exact_index: Dict[str, str] = exact
+        
+        # Normalized forms, including xml_tags so 'Compressor2' or 'auto-filter' resolve too
+        index: Dict[str, str] = {}
+        for term, canon in exact.items():
+            index.setdefault(normalize_device_name(term), canon)
+        for k, info in audio_effects.items():
+            index.setdefault(normalize_device_name(info.get("xml_tag", k)), k)
+        self.name_index: Dict[str, str] = index
+        
+        self._extracted_index: Dict[str, str] = {}
+        for k in self.extracted_params.keys():
+            self._extracted_index.setdefault(k.lower(), k)
+        
+        self._fuzzy_keys = [(_fuzzy_device_key(k), k) for k in audio_effects.keys()]
+        self._fuzzy_cache: Dict[str, Optional[str]] = {}
+
+    def lookup_device_name(self, name: str) -> Optional[str]:
+        """Hash lookup of any known name form, returns the canonical key or None"""
+        canon = self._exact_index.get(name.lower().strip())
+        if canon is None:
+            canon = self.name_index.get(normalize_device_name(name))
+        return canon
+
+    def fuzzy_match(self, name: str) -> Optional[str]:
+        """Best-effort device key for loosely spelled names (memoized)"""
+        target = _fuzzy_device_key(name)
+        if target in self._fuzzy_cache:
+            return self._fuzzy_cache[target]
+        match = self.name_index.get(normalize_device_name(name))
+        if match is None:
+            for db_norm, db_key in self._fuzzy_keys:
+                if target == db_norm or target in db_norm or db_norm in target:
+                    match = db_key
+                    break
+        if match is not None:
+            # Substring hits are unbounded ("my compressor 2"...): keep the newest FUZZY_CACHE_MAX
+            if len(self._fuzzy_cache) >= FUZZY_CACHE_MAX:
+                self._fuzzy_cache.pop(next(iter(self._fuzzy_cache), None), None)
+            self._fuzzy_cache[target] = match
+        return match
+
     def _load_database(self) -> Dict:
         """Load device database from split JSON files (V52)"""
         devices_map = {"devices": {"audio_effects": {}, "instruments": {}}}
@@ -297,33 +538,49 @@ class DeviceDatabase:
             print(f"Warning: Could not load extracted parameters: {e}")
         return {}
 
-    def get_device(self, name: str) -> Optional[Dict]:
-        """Get device configuration by name, merging with extracted params"""
+    def get_device(self, name: str) -> Optional[Mapping]:
+        """Get the fully merged, read-only device spec by name (memoized)"""
+        search_name = name.lower().strip()
+        canon = self._spec_lookup.get(search_name, _UNRESOLVED)
+        if canon is _UNRESOLVED:
+            with self._spec_lock:
+                canon = self._spec_lookup.get(search_name, _UNRESOLVED)
+                if canon is _UNRESOLVED:
+                    canon, device = self._resolve_device(name)
+                    if device is not None and canon not in self._spec_cache:
+                        spec = _freeze(device)
+                        self._spec_cache[canon] = spec
+                        self._spec_fingerprints[id(spec)] = hashlib.sha1(
+                            json.dumps(device, sort_keys=True, default=str).encode('utf-8')
+                        ).hexdigest()[:16]
+                    if canon is not None:
+                        # Only resolving spellings are memoized (bounded by the registry's names);
+                        # misses are cheap and keyed by arbitrary LLM/client input
+                        self._spec_lookup[search_name] = canon
+        if canon is None:
+            return None
+        return self._spec_cache[canon]
+
+    def spec_fingerprint(self, spec: Mapping) -> Optional[str]:
+        """Content hash of a spec returned by get_device (None for foreign objects)"""
+        return self._spec_fingerprints.get(id(spec))
+
+    def _resolve_device(self, name: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """Resolve a name to its canonical key and build a merged copy of its spec"""
         audio_effects = self.devices.get("devices", {}).get("audio_effects", {})
         
         # Resolve canonical name using aliases first (case-insensitive)
-        canon = name
         search_name = name.lower().strip()
-        
-        if search_name in self.aliases:
-            canon = self.aliases[search_name]
-        else:
-            # Check if it's a direct match (case-insensitive)
-            found = False
-            for k in audio_effects.keys():
-                if k.lower() == search_name:
-                    canon = k
-                    found = True
-                    break
+        canon = self._exact_index.get(search_name, name)
             
         device = audio_effects.get(canon)
-        if not device:
+        if device:
+            # V66: Work on a copy, the registry entries are shared by every request
+            device = dict(device)
+            device["parameters"] = list(device.get("parameters", []))
+        else:
             # Try to build a basic device from extracted params if it exists there
-            actual_key = None
-            for k in self.extracted_params.keys():
-                if k.lower() == search_name:
-                    actual_key = k
-                    break
+            actual_key = self._extracted_index.get(search_name)
             
             if actual_key:
                 # V24: Crucial fix - Don't create an empty skeleton. 
@@ -346,7 +603,7 @@ class DeviceDatabase:
                 }
                 canon = actual_key
             else:
-                return None
+                return None, None
 
         # Merge in extracted parameters that aren't already defined
         # SMART MERGE: Re-enabled to support devices missing from devices.json (GrainDelay, Echo)
@@ -355,39 +612,19 @@ class DeviceDatabase:
         xml_tag = device.get("xml_tag", canon)
         
         # 1. Virtual Parameter Injection (Sidechain / Advanced Controls)
-        VIRTUAL_P = {
-            "AutoFilter2": [
-                {"name": "Sidechain_Gain", "default": 1.0, "min": 0.0, "max": 10.0},
-                {"name": "Sidechain_Mix", "default": 1.0, "min": 0.0, "max": 1.0}
-            ],
-            "Compressor2": [
-                {"name": "Sidechain_Gain", "default": 1.0, "min": 0.0, "max": 10.0},
-                {"name": "Sidechain_Mix", "default": 1.0, "min": 0.0, "max": 1.0}
-            ],
-            "Gate": [
-                {"name": "Sidechain_Gain", "default": 1.0, "min": 0.0, "max": 10.0},
-                {"name": "Sidechain_Mix", "default": 1.0, "min": 0.0, "max": 1.0}
-            ],
-            "BeatRepeat": [
-                {"name": "Variation", "default": 0.0, "min": 0.0, "max": 10.0},
-                {"name": "Mix_Mode", "default": 0.0, "min": 0.0, "max": 2.0}
-            ]
-        }
-        
-        if xml_tag in VIRTUAL_P:
-            existing_names = {p["name"] for p in device.get("parameters", [])}
-            for p in VIRTUAL_P[xml_tag]:
+        if xml_tag in VIRTUAL_PARAMETERS:
+            existing_names = {p["name"] for p in device["parameters"]}
+            for p in VIRTUAL_PARAMETERS[xml_tag]:
                 if p["name"] not in existing_names:
-                    device["parameters"].append(p)
+                    device["parameters"].append(dict(p))
 
         # 2. Smart Merge with Extracted Params
         if xml_tag in self.extracted_params:
             # Re-read existing names after virtual injection
-            existing_names = {p["name"] for p in device.get("parameters", [])}
+            existing_names = {p["name"] for p in device["parameters"]}
             
-            BLACKLIST = {"LegacyGain", "BranchSelectorRange", "WarpWait", "LaunchWait"}
             for p_name in self.extracted_params[xml_tag]:
-                if p_name in existing_names or p_name in BLACKLIST: continue
+                if p_name in existing_names or p_name in MERGE_BLACKLIST: continue
                 if "." in p_name and p_name.split(".")[-1].isdigit(): continue 
                 
                 device["parameters"].append({
@@ -397,7 +634,7 @@ class DeviceDatabase:
                     "max": 1.0
                 })
         
-        return device
+        return canon, device
     
     def get_all_devices(self) -> Dict:
         """Get all available devices"""
@@ -407,13 +644,18 @@ class DeviceDatabase:
         """Get total number of devices"""
         return len(self.get_all_devices())
     
-    def get_macro_suggestions(self, device_name: str) -> List[Dict]:
-        """Get suggested macro mappings for a device"""
+    def get_macro_suggestions(self, device_name: str) -> Sequence[Mapping]:
+        """Get suggested macro mappings for a device (read-only, memoized)"""
+        search_name = device_name.lower().strip()
+        cached = self._suggestion_cache.get(search_name)
+        if cached is not None:
+            return cached
+        
         device = self.get_device(device_name)
         if not device:
-            return []
+            return ()
         
-        suggestions = device.get("macro_suggestions", [])
+        suggestions = device.get("macro_suggestions", ())
         
         # If no suggestions, use first few parameters
         if not suggestions and device.get("parameters"):
@@ -426,24 +668,15 @@ class DeviceDatabase:
                     "min": param.get("min", 0.0),
                     "max": param.get("max", 1.0)
                 })
+            suggestions = _freeze(suggestions)
         
+        self._suggestion_cache[search_name] = suggestions
         return suggestions
     
     def resolve_alias(self, name: str) -> str:
         """Resolve device alias to canonical name"""
-        search_name = name.lower().strip()
-        
-        # 1. Direct Alias
-        if search_name in self.aliases:
-            return self.aliases[search_name]
-            
-        # 2. Direct casing match in audio_effects
-        audio_effects = self.devices.get("devices", {}).get("audio_effects", {})
-        for k in audio_effects.keys():
-            if k.lower() == search_name:
-                return k
-                
-        return name
+        # 1. Direct Alias / casing match, 2. Normalized spelling or xml_tag
+        return self.lookup_device_name(name) or name
 
     def get_parameter_aliases(self) -> Dict[str, Dict[str, str]]:
         """Get all parameter aliases for NLP prompt injection"""
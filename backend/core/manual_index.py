@@ -0,0 +1,149 @@
+"""
+Manual Index - BM25 retrieval over MANUAL_EXTRACT.txt, chunked by manual section
+"""
+
+import hashlib
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List
+
+# Second-level headings of the PDF extract ("28.2 1 Glue Compressor", "24.7 Using the Macro Controls").
+# Deeper headings ("28.37 . 1 Freezer Section") stay inside their parent section.
+SECTION_HEADING = re.compile(r'^(\d+)\.\s?(\d[\d ]*?)\s+([A-Z][A-Za-z&/ -]+)$')
+# PDF artifacts that only cost tokens
+NOISE_LINE = re.compile(r'^(--- PAGE \d+ ---|\d+|•\s*)$')
+TOKEN = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    "a an and are as at be by can for from has have in into is it its of on or that the this to "
+    "when which while with you your will also each other than then there these they".split()
+)
+
+CHUNK_CHARS = 1500
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class ManualChunk:
+    __slots__ = ("section", "position", "text", "length", "freqs")
+
+    def __init__(self, section: str, position: int, text: str):
+        self.section = section
+        self.position = position
+        self.text = text
+        tokens = tokenize(f"{section} {text}")
+        self.length = len(tokens)
+        self.freqs = Counter(tokens)
+
+
+class ManualIndex:
+    """Okapi BM25 over ~1.5k-char passages, each tagged with its manual section title"""
+
+    def __init__(self, text: str, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+        self.sections: Dict[str, List[ManualChunk]] = {}
+        self.chunks: List[ManualChunk] = []
+        for title, body in self._split_sections(text):
+            for passage in self._split_passages(body):
+                chunk = ManualChunk(title, len(self.chunks), passage)
+                self.chunks.append(chunk)
+                self.sections.setdefault(title, []).append(chunk)
+
+        doc_freq = Counter()
+        for chunk in self.chunks:
+            doc_freq.update(chunk.freqs.keys())
+        n = max(1, len(self.chunks))
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+        self.avg_length = sum(c.length for c in self.chunks) / n if self.chunks else 0.0
+
+    @staticmethod
+    def _split_sections(text: str):
+        title, lines = "Introduction", []
+        for line in text.splitlines():
+            line = line.rstrip()
+            if NOISE_LINE.match(line.strip()):
+                continue
+            heading = SECTION_HEADING.match(line.strip())
+            if heading:
+                if lines:
+                    yield title, "\n".join(lines)
+                title, lines = heading.group(3).strip(), [line]
+            else:
+                lines.append(line)
+        if lines:
+            yield title, "\n".join(lines)
+
+    @staticmethod
+    def _split_passages(body: str) -> List[str]:
+        passages, current, size = [], [], 0
+        for line in body.splitlines():
+            if size >= CHUNK_CHARS and line[:1].isupper():  # Break at a sentence/paragraph start
+                passages.append("\n".join(current))
+                current, size = [], 0
+            current.append(line)
+            size += len(line) + 1
+        if current:
+            passages.append("\n".join(current))
+        return passages
+
+    def score(self, query: str) -> Dict[int, float]:
+        """BM25 score per chunk position (chunks without query terms are omitted)"""
+        terms = set(tokenize(query))
+        scores: Dict[int, float] = {}
+        for chunk in self.chunks:
+            total = 0.0
+            for term in terms:
+                tf = chunk.freqs.get(term)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * chunk.length / (self.avg_length or 1))
+                    total += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if total > 0:
+                scores[chunk.position] = total
+        return scores
+
+    def section_text(self, title: str) -> str:
+        return "\n".join(chunk.text for chunk in self.sections.get(title, []))
+
+    def retrieve(self, query: str, section_titles: Iterable[str] = (), budget_chars: int = 12000) -> str:
+        """Relevant manual excerpts: named sections first (best passages), then top BM25 passages"""
+        scores = self.score(query)
+        ranked = lambda chunks: sorted(chunks, key=lambda c: (-scores.get(c.position, 0.0), c.position))
+        titles = [t for t in dict.fromkeys(section_titles) if t in self.sections]
+
+        picked, used = set(), 0
+
+        def take(chunk: ManualChunk, limit: int) -> bool:
+            nonlocal used
+            if chunk.position in picked or used + len(chunk.text) > limit:
+                return False
+            picked.add(chunk.position)
+            used += len(chunk.text)
+            return True
+
+        # 1. Sections for devices the prompt names, each gets an equal share of the budget
+        if titles:
+            share = budget_chars // (len(titles) + 1)
+            for title in titles:
+                limit = used + share
+                for chunk in ranked(self.sections[title]):
+                    take(chunk, limit)
+
+        # 2. Whatever else the query is about (sidechain, ducking, stereo width...)
+        for position in sorted(scores, key=lambda p: -scores[p]):
+            if used >= budget_chars:
+                break
+            take(self.chunks[position], budget_chars)
+
+        # Render in manual order so passages of one section read contiguously
+        blocks, last_section = [], None
+        for position in sorted(picked):
+            chunk = self.chunks[position]
+            if chunk.section != last_section:
+                blocks.append(f"### {chunk.section}")
+                last_section = chunk.section
+            blocks.append(chunk.text)
+        return "\n".join(blocks)
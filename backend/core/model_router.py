@@ -0,0 +1,52 @@
+"""
+Model Router - Send simple prompts to a fast model, sound-design prompts to the pro model
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+
+# Requests that usually need real reasoning about routing, modulation or mastering
+COMPLEX_INTENT = re.compile(
+    r'\b(parallel|multiband|sidechain|side-chain|duck\w*|glitch\w*|granular|evolving|morph\w*|'
+    r'mastering|master|dj|transition|build-?up|riser|stutter|resampl\w*|sound design|cinematic)\b'
+)
+
+
+class ModelRouter:
+    """Cheap complexity score from prompt features, no model call involved.
+
+    score = named devices + requested macros beyond 8 (x0.5) + prompt length (1 per 20 words, max 3)
+            + 1.5 per complex intent keyword (max 3)
+    """
+
+    def __init__(self, fast_model: str, pro_model: str, threshold: float = 4.0):
+        self.fast_model = fast_model
+        self.pro_model = pro_model
+        self.threshold = threshold
+        self.routed = {"fast": 0, "pro": 0}  # Actual LLM calls per tier (cache hits excluded)
+
+    def score(self, text: str, device_count: int, macro_count: Optional[int] = None) -> float:
+        words = len(text.split())
+        intents = len(set(COMPLEX_INTENT.findall(text.lower())))
+        return round(
+            device_count
+            + 0.5 * max(0, (macro_count or 8) - 8)
+            + min(3.0, words / 20)
+            + min(3.0, 1.5 * intents),
+            2,
+        )
+
+    def route(self, text: str, device_count: int, macro_count: Optional[int] = None) -> Tuple[str, float]:
+        """(model, complexity); counting happens in record_call once the model is really invoked"""
+        complexity = self.score(text, device_count, macro_count)
+        return (self.pro_model if complexity >= self.threshold else self.fast_model), complexity
+
+    def record_call(self, model_id: str):
+        if model_id == self.pro_model:
+            self.routed["pro"] += 1
+        elif model_id == self.fast_model:
+            self.routed["fast"] += 1
+
+    def stats(self) -> Dict:
+        return {"fast_model": self.fast_model, "pro_model": self.pro_model,
+                "threshold": self.threshold, "routed": dict(self.routed)}
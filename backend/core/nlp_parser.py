@@ -5,20 +5,83 @@ NLP Parser - Extract rack specifications from natural language using Gemini
 import re
 import json
 import os
-from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import time
+from typing import Dict, List, Optional, Tuple
 from core.builder import AudioEffectRack, Chain, AbletonDevice
+from core.prompt_cache import ContextCacheProvider, GeminiContextCache
+from core.parse_cache import ParseCache
+from core.circuit_breaker import LatencyCircuitBreaker
+from core.manual_index import ManualIndex
+from core.model_router import ModelRouter
+from core.trace_ring import TRACES
 import google.genai as genai
 from google.genai import types
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Incremental device extraction from a partial JSON response (complete string tokens only)
+PARTIAL_NAME_FIELD = re.compile(r'"(?:name|target_device)"\s*:\s*"([^"\\]+)"')
+PARTIAL_DEVICES_START = re.compile(r'"devices"\s*:\s*\[')
+PARTIAL_ARRAY_STRING = re.compile(r'[\[,]\s*"([^"\\]+)"\s*(?=[,\]])')
+# Carried between chunks so a name split across two chunks still matches (longer than any name field)
+PARTIAL_SCAN_OVERLAP = 256
+
+class PartialDeviceScanner:
+    """Known devices named so far in a streamed model response (bare strings in "devices" or name fields).
+
+    Each chunk is scanned once together with the last PARTIAL_SCAN_OVERLAP chars of
+    the previous window, so the cost is linear in the response length.
+    """
+
+    def __init__(self, resolve):
+        self.resolve = resolve  # name -> canonical device or None
+        self.window = ""
+        self.array_from: Optional[int] = None  # Offset of the "devices" '[' in window while inside it
+        self.array_done = False
+        self.found: List[str] = []
+
+    def feed(self, chunk: str) -> List[str]:
+        """Newly named devices (canonical, each reported once)"""
+        window = self.window + chunk
+        hits = [(m.start(1), m.group(1)) for m in PARTIAL_NAME_FIELD.finditer(window)]
+
+        if self.array_from is None and not self.array_done:
+            start = PARTIAL_DEVICES_START.search(window)
+            if start:
+                self.array_from = start.end() - 1
+        if self.array_from is not None:
+            offset = self.array_from
+            region = window[offset:]
+            end = region.find("]")
+            if end >= 0:
+                region = region[:end + 1]
+                self.array_from, self.array_done = None, True
+            hits += [(offset + m.start(1), m.group(1)) for m in PARTIAL_ARRAY_STRING.finditer(region)]
+
+        new = []
+        for _, name in sorted(hits, key=lambda hit: hit[0]):
+            canon = self.resolve(name)
+            if canon and canon not in self.found:
+                self.found.append(canon)
+                new.append(canon)
+
+        cut = max(0, len(window) - PARTIAL_SCAN_OVERLAP)
+        self.window = window[cut:]
+        if self.array_from is not None:
+            self.array_from = max(0, self.array_from - cut)
+        return new
+
+
 class RackNLPParser:
     """Parse natural language into rack specifications using AI or Regex"""
     
-    def __init__(self, device_db):
+    def __init__(self, device_db, context_cache: Optional[ContextCacheProvider] = None,
+                 parse_cache: Optional[ParseCache] = None):
         self.device_db = device_db
-        self.device_patterns = self._build_device_patterns()
+        self.device_pattern, self.device_terms = self._build_device_patterns()
         
         # Initialize Gemini 2.0+ Client
         api_key = os.getenv("GOOGLE_API_KEY")
@@ -28,11 +91,15 @@ class RackNLPParser:
                 self.client = genai.Client(api_key=api_key)
                 # V20: Upgraded to Gemini 3.1 Pro (Feb 19, 2026 Release)
                 # This model delivers a 94.3% GPQA score, making it the most intelligent reasoning model available.
-                self.model_id = 'gemini-3.1-pro-preview'
+                self.model_id = os.getenv("GEMINI_MODEL_PRO", 'gemini-3.1-pro-preview')
                 self.ai_enabled = True
             except Exception as e:
                 print(f"Warning: Failed to initialize Gemini Client: {e}")
 
+        # V66: Provider calls go through the SDK's async client, at most N in flight per worker
+        self.max_ai_concurrency = max(1, int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")))
+        self._ai_semaphore = asyncio.Semaphore(self.max_ai_concurrency)
+
         # V50 KNOWLEDGE INJECTION
         self.knowledge_base = ""
         try:
@@ -46,6 +113,11 @@ class RackNLPParser:
         except Exception as e:
             print(f"Warning: Failed to load Knowledge Base: {e}")
 
+        # V66: The manual is retrieved per request (BM25 over device sections) instead of a fixed 50k slice
+        self.manual_index = ManualIndex(self.knowledge_base) if self.knowledge_base else None
+        self.manual_context_chars = int(os.getenv("MANUAL_CONTEXT_CHARS", "12000"))
+        self.device_sections = self._map_device_sections()
+
         # V51 PROTOCOL INJECTION
         self.behavior_protocol = ""
         try:
@@ -59,40 +131,270 @@ class RackNLPParser:
         except Exception as e:
             print(f"Warning: Failed to load AI Behavior Protocol: {e}")
 
-    def _build_device_patterns(self) -> List[str]:
-        """Build regex patterns for deterministic fallback"""
+        # V66: The system prompt has no per-request parts, so it is assembled once here
+        self.system_prompt = self._build_system_prompt()
+        self.context_cache = context_cache
+        if self.context_cache is None and self.ai_enabled and os.getenv("GEMINI_CONTEXT_CACHE", "1") != "0":
+            self.context_cache = GeminiContextCache(self.client, int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600")))
+
+        # V66: Resolved specs for repeated prompts, invalidated by DB/knowledge changes via cache_version
+        self.parse_cache = parse_cache
+        if self.parse_cache is None and os.getenv("PARSE_CACHE", "1") != "0":
+            self.parse_cache = ParseCache(
+                os.getenv("PARSE_CACHE_DIR", os.path.join(os.path.dirname(__file__), '..', 'cache', 'parse_results')),
+                max_entries=int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "512")),
+                max_disk_entries=int(os.getenv("PARSE_CACHE_MAX_DISK_ENTRIES", "5000")),
+                ttl_seconds=int(os.getenv("PARSE_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+        self.cache_version = self._compute_cache_version()
+        # A registry rebuild changes the device list in the prompt: re-derive it and drop stale handles
+        self.device_db.add_reload_listener(self.refresh_system_prompt)
+
+        # V66: Latency budget per parse (0 = wait forever) and one breaker per model, each with its own SLO
+        # (a pro model answering in 30s is healthy, a flash model doing the same is not)
+        self.parse_deadline_s = float(os.getenv("PARSE_DEADLINE_S", "45"))
+        self.latency_slo_s = float(os.getenv("GEMINI_LATENCY_SLO_S", "20"))
+        self.latency_slo_pro_s = float(os.getenv("GEMINI_LATENCY_SLO_PRO_S", "60"))
+        self.breaker_cooldown_s = float(os.getenv("GEMINI_BREAKER_COOLDOWN_S", "60"))
+        self.circuit_breakers: Dict[str, LatencyCircuitBreaker] = {}
+        self.deadline_misses = 0
+
+        # V66: Simple prompts ("compressor and EQ") don't need the pro model
+        self.model_router = None
+        if self.ai_enabled and os.getenv("GEMINI_MODEL_ROUTING", "1") != "0":
+            self.model_router = ModelRouter(
+                fast_model=os.getenv("GEMINI_MODEL_FAST", 'gemini-3-flash-preview'),
+                pro_model=self.model_id,
+                threshold=float(os.getenv("GEMINI_ROUTING_THRESHOLD", "4.0")),
+            )
+
+    def _build_device_patterns(self) -> Tuple["re.Pattern", Dict[str, str]]:
+        """Build the deterministic fallback matcher: one alternation, longest term first"""
         all_names = list(self.device_db.get_all_devices().keys())
         all_aliases = list(self.device_db.aliases.keys())
-        all_terms = sorted(list(set(all_names + all_aliases)), key=len, reverse=True)
-        return [re.escape(term.lower()) for term in all_terms]
+        all_terms = sorted(set(term.lower() for term in all_names + all_aliases), key=len, reverse=True)
+        # V66: Terms are resolved once here instead of on every fallback hit
+        term_to_device = {term: self.device_db.resolve_alias(term) for term in all_terms}
+        pattern = re.compile(r'\b(?:' + '|'.join(re.escape(term) for term in all_terms) + r')\b')
+        return pattern, term_to_device
+
+    async def parse(self, text: str, deadline_s: Optional[float] = None, macro_count: Optional[int] = None) -> Dict:
+        """Parse user input, preferring AI if enabled (deadline_s overrides PARSE_DEADLINE_S)"""
+        if not self.ai_enabled:
+            return self._parse_with_regex(text)
+        route = self._route(text, macro_count)
+        key, cached = await self._cached_spec(text, route[0])
+        if cached is not None:
+            return cached
+        spec = await self._parse_with_deadline(text, self.parse_deadline_s if deadline_s is None else deadline_s, route)
+        await self._remember_spec(key, spec)
+        return spec
 
-    async def parse(self, text: str) -> Dict:
-        """Parse user input, preferring AI if enabled"""
-        if self.ai_enabled:
-            return await self._parse_with_ai(text)
-        return self._parse_with_regex(text)
+    def _route(self, text: str, macro_count: Optional[int]) -> Tuple[str, Optional[float]]:
+        """(model id, complexity score) for this prompt"""
+        if self.model_router is None:
+            return self.model_id, None
+        return self.model_router.route(text, len(self._prompt_devices(text)), macro_count)
 
-    async def _parse_with_ai(self, text: str) -> Dict:
-        """Use Gemini with V7 Surgical Prompt"""
+    async def _cached_spec(self, text: str, model_id: str) -> Tuple[Optional[str], Optional[Dict]]:
+        if self.parse_cache is None:
+            return None, None
+        key = self.parse_cache.make_key(text, model_id, self.cache_version)
+        cached = await self.parse_cache.aget(key)
+        if cached is not None:
+            cached["cache_hit"] = True
+        return key, cached
+
+    async def _remember_spec(self, key: Optional[str], spec: Dict):
+        # Regex fallbacks are outage artifacts, only real model answers are worth replaying
+        if key is not None and spec.get("ai_powered"):
+            await self.parse_cache.aput(key, spec)
+
+    def _breaker(self, model_id: str) -> LatencyCircuitBreaker:
+        breaker = self.circuit_breakers.get(model_id)
+        if breaker is None:
+            slo = self.latency_slo_pro_s if model_id == self.model_id else self.latency_slo_s
+            breaker = self.circuit_breakers[model_id] = LatencyCircuitBreaker(
+                slo_seconds=slo, cooldown_seconds=self.breaker_cooldown_s
+            )
+        return breaker
+
+    async def _parse_with_deadline(self, text: str, budget: float, route: Tuple[str, Optional[float]]) -> Dict:
+        """Race the LLM against the latency budget, the regex spec is the hedge"""
+        breaker = self._breaker(route[0])
+        ticket = breaker.allow()
+        if ticket is None:
+            spec = self._parse_with_regex(text)
+            spec["fallback_reason"] = "circuit_open"
+            return spec
+
+        started = time.monotonic()
+        ai_task = asyncio.ensure_future(self._parse_with_ai(text, route))
+        # Speculative fallback, ready long before the model answers
+        fallback = self._parse_with_regex(text)
+        try:
+            done, _ = await asyncio.wait({ai_task}, timeout=budget if budget > 0 else None)
+        except asyncio.CancelledError:
+            ai_task.cancel()
+            breaker.release_probe(ticket)
+            raise
+
+        if not done:
+            ai_task.cancel()
+            return self._deadline_fallback(fallback, started, budget, breaker, ticket)
+
+        spec = ai_task.result()
+        breaker.record(time.monotonic() - started, ok=spec.get("ai_powered", False), ticket=ticket)
+        return spec
+
+    def _deadline_fallback(self, fallback: Dict, started: float, budget: float,
+                           breaker: LatencyCircuitBreaker, ticket: Optional[int]) -> Dict:
+        self.deadline_misses += 1
+        elapsed = time.monotonic() - started
+        if elapsed >= breaker.slo_seconds:
+            breaker.record(elapsed, ok=False, ticket=ticket)
+        else:
+            # A budget tighter than the SLO says nothing about provider health
+            breaker.release_probe(ticket)
+        print(f"Warning: LLM missed the {budget}s budget, serving regex fallback")
+        fallback["fallback_reason"] = "deadline"
+        return fallback
+
+    async def parse_stream(self, text: str, deadline_s: Optional[float] = None, macro_count: Optional[int] = None):
+        """Streaming parse: yields ("device", name) as the model names devices, then ("spec", spec)"""
+        if not self.ai_enabled:
+            yield "spec", self._parse_with_regex(text)
+            return
+        route = self._route(text, macro_count)
+        key, cached = await self._cached_spec(text, route[0])
+        if cached is not None:
+            yield "spec", cached
+            return
+        breaker = self._breaker(route[0])
+        ticket = breaker.allow()
+        if ticket is None:
+            spec = self._parse_with_regex(text)
+            spec["fallback_reason"] = "circuit_open"
+            yield "spec", spec
+            return
+
+        budget = self.parse_deadline_s if deadline_s is None else deadline_s
+        started = time.monotonic()
+        fallback = self._parse_with_regex(text)
+        chunks = []
+        scanner = PartialDeviceScanner(self._known_device)
+        remaining = lambda: budget - (time.monotonic() - started) if budget > 0 else None
+        stream = None
+        retried = False
+        try:
+            # Context-cache creation can be a provider round-trip: it spends the same budget
+            cache_handle, contents = await asyncio.wait_for(self._prepare_request(text, route[0]), remaining())
+            stream = self._stream_content(contents, self._generation_config(cache_handle), route[0])
+            while True:
+                left = remaining()
+                if left is not None and left <= 0:
+                    raise asyncio.TimeoutError
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), left)
+                except StopAsyncIteration:
+                    break
+                except Exception as e:
+                    if chunks or retried or not self._drop_stale_context(cache_handle, e):
+                        raise
+                    retried = True
+                    await stream.aclose()
+                    cache_handle, contents = await asyncio.wait_for(self._prepare_request(text, route[0]), remaining())
+                    stream = self._stream_content(contents, self._generation_config(cache_handle), route[0])
+                    continue
+                chunks.append(chunk)
+                # Resolve devices from the partial JSON so the client can show them before the spec is complete
+                for name in scanner.feed(chunk):
+                    yield "device", name
+            spec = self._spec_from_response("".join(chunks), text, route)
+        except asyncio.TimeoutError:
+            yield "spec", self._deadline_fallback(fallback, started, budget, breaker, ticket)
+            return
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client went away (or the consumer closed us mid-stream): no measurement
+            breaker.release_probe(ticket)
+            raise
+        except Exception as e:
+            print(f"AI Parse failed: {e}")
+            breaker.record(time.monotonic() - started, ok=False, ticket=ticket)
+            yield "spec", fallback
+            return
+        finally:
+            if stream is not None:
+                await stream.aclose()
+
+        breaker.record(time.monotonic() - started, ok=True, ticket=ticket)
+        await self._remember_spec(key, spec)
+        yield "spec", spec
+
+    def _known_device(self, name: str) -> Optional[str]:
+        canon = self.device_db.resolve_alias(name)
+        return canon if canon in self.device_db.get_all_devices() else None
+
+    def _compute_cache_version(self) -> str:
+        """Device registry version + hash of everything the model sees besides the user prompt"""
+        digest = hashlib.sha256()
+        digest.update(str(getattr(self.device_db, "registry_version", "")).encode('utf-8'))
+        digest.update(self.system_prompt.encode('utf-8'))
+        if self.manual_index is not None:
+            digest.update(f"{self.manual_index.digest}:{self.manual_context_chars}".encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def _map_device_sections(self) -> Dict[str, str]:
+        """Canonical device name -> manual section title ('Spectral Resonator' -> SpectralResonator)"""
+        if self.manual_index is None:
+            return {}
+        known = self.device_db.get_all_devices()
+        mapping = {}
+        for title in self.manual_index.sections:
+            # Manual titles vs DB names: 'Auto Pan-Tremolo' -> Auto Pan, 'Resonators' -> Resonator
+            for candidate in (title, title.split('-')[0], title[:-1] if title.endswith('s') else title):
+                canon = self.device_db.resolve_alias(candidate)
+                if canon in known:
+                    mapping.setdefault(canon, title)
+                    break
+        # Other names of the same device share its section ('Chorus' and 'Chorus-Ensemble' are both Chorus2)
+        by_tag = {known[canon].get("xml_tag"): title for canon, title in mapping.items() if known[canon].get("xml_tag")}
+        for canon, info in known.items():
+            if canon not in mapping and info.get("xml_tag") in by_tag:
+                mapping[canon] = by_tag[info["xml_tag"]]
+        return mapping
+
+    def _manual_context(self, text: str) -> str:
+        """Per-request manual excerpts: sections of the devices the prompt names + BM25 matches"""
+        if self.manual_index is None or self.manual_context_chars <= 0:
+            return ""
+        titles = [self.device_sections[d] for d in self._prompt_devices(text) if d in self.device_sections]
+        excerpts = self.manual_index.retrieve(text, titles, self.manual_context_chars)
+        return f"## 📚 RELEVANT MANUAL SECTIONS:\n{excerpts}\n\n" if excerpts else ""
+
+    def _build_system_prompt(self) -> str:
+        """Static prompt prefix: protocol, manual, surgical dictionary and device list"""
         available_devices = list(self.device_db.get_all_devices().keys()) + list(self.device_db.aliases.keys())
         
         # V47 Dynamic Surgical Dictionary
-        surgical_dict_text = ""
+        surgical_lines = []
         if hasattr(self.device_db, "get_parameter_aliases"):
             aliases = self.device_db.get_parameter_aliases()
             for dev, params in aliases.items():
                 for alias, target in params.items():
-                    surgical_dict_text += f'        - "{alias}" -> Use `{target}` (for {dev})\n'
+                    surgical_lines.append(f'        - "{alias}" -> Use `{target}` (for {dev})\n')
+        surgical_dict_text = "".join(surgical_lines)
 
         # V62: RESTRUCTURED PROMPT FOR STABILITY
-        system_prompt = f"""
+        return f"""
 ROLE: You are the Ultimate Ableton Sound Design Specialist. 
 TASK: Generate a complex, professional-grade Audio Effect Rack.
 
 {self.behavior_protocol}
 
 ## 📚 REFERENCE KNOWLEDGE (OFFICIAL MANUAL):
-{self.knowledge_base[:50000]} 
+{self.manual_index.section_text("Using the Macro Controls") if self.manual_index else ""}
+(Device-specific manual sections are attached to each request.)
 
 ## 🔧 SURGICAL PARAMETER DICTIONARY:
 {surgical_dict_text}
@@ -107,153 +409,228 @@ TASK: Generate a complex, professional-grade Audio Effect Rack.
 4. **MULTI-DEVICE DENSITY**: At least 4 out of 8 macros MUST control parameters across multiple devices.
 5. **JSON ONLY**: Return strictly valid JSON. No preamble.
 """
-        
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_id,
-                contents=f"{system_prompt}\n\nUSER PROMPT: {text}",
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    temperature=0.1, # Keep it deterministic and focused
+
+    def refresh_system_prompt(self):
+        """Rebuild DB-derived state (fallback matcher, static prefix) after a DB reload and drop stale cache handles"""
+        self.device_pattern, self.device_terms = self._build_device_patterns()
+        self.device_sections = self._map_device_sections()
+        self.system_prompt = self._build_system_prompt()
+        self.cache_version = self._compute_cache_version()
+        if self.context_cache is not None:
+            self.context_cache.invalidate()
+
+    async def _prepare_request(self, text: str, model_id: str) -> Tuple[Optional[str], str]:
+        """Cache handle for the static prefix (if any) and the per-request contents"""
+        # V66: Static prefix lives in a provider-side cached context when available
+        cache_handle = None
+        if self.context_cache is not None:
+            cache_handle = await self.context_cache.get_handle(model_id, self.system_prompt)
+
+        request_context = f"{self._manual_context(text)}USER PROMPT: {text}"
+        if cache_handle:
+            return cache_handle, request_context
+        return None, f"{self.system_prompt}\n\n{request_context}"
+
+    @staticmethod
+    def _generation_config(cache_handle: Optional[str]):
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            temperature=0.1, # Keep it deterministic and focused
+            cached_content=cache_handle,
+        )
+
+    async def _parse_with_ai(self, text: str, route: Optional[Tuple[str, Optional[float]]] = None) -> Dict:
+        """Use Gemini with V7 Surgical Prompt"""
+        route = route or (self.model_id, None)
+        for attempt in range(2):
+            cache_handle, contents = await self._prepare_request(text, route[0])
+            try:
+                response = await self._generate_content(
+                    contents=contents,
+                    config=self._generation_config(cache_handle),
+                    model_id=route[0]
                 )
-            )
-            
-            # Clean and Log Raw JSON for Debugging
-            raw_text = response.text.strip()
-            
-            # V64: Robust Sanitization for non-standard JSON (handles -inf, inf, nan with any whitespace)
-            import re
-            raw_text = re.sub(r':\s*-?inf(inity)?\b', ': -999.0', raw_text, flags=re.IGNORECASE)
-            raw_text = re.sub(r':\s*nan\b', ': 0.0', raw_text, flags=re.IGNORECASE)
-            
-            with open("last_ai_response_raw.json", "w", encoding='utf-8') as f:
-                f.write(raw_text)
-            
-            if "```json" in raw_text:
-                raw_text = raw_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in raw_text:
-                raw_text = raw_text.split("```")[1].split("```")[0].strip()
-            
-            data = json.loads(raw_text)
-            
-            # V65: Log the final processed spec for debugging
-            with open("last_spec_debug.json", "w", encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
-            
-            # V40 Robustness: If AI returns a list, take the first element
-            if isinstance(data, list) and len(data) > 0:
-                data = data[0]
-            
-            if not isinstance(data, dict):
-                print(f"WARNING: AI returned non-dict JSON: {type(data)}")
+                return self._spec_from_response(response.text, text, route)
+            except Exception as e:
+                if attempt == 0 and self._drop_stale_context(cache_handle, e):
+                    continue  # Once more with a fresh handle
+                print(f"AI Parse failed: {e}")
                 return self._parse_with_regex(text)
+
+    def _drop_stale_context(self, cache_handle: Optional[str], error: Exception) -> bool:
+        """Invalidate a cached context the provider no longer has; True if the call is worth retrying"""
+        if not cache_handle or not self.context_cache.is_stale_handle_error(error):
+            return False
+        print(f"Warning: Cached context {cache_handle} is gone, recreating it: {error}")
+        self.context_cache.invalidate()
+        return True
+
+    def _spec_from_response(self, raw_text: str, text: str, route: Tuple[str, Optional[float]]) -> Dict:
+        """Model JSON -> resolved rack spec (raises on unparseable output)"""
+        # Clean and Log Raw JSON for Debugging
+        raw_text = raw_text.strip()
+        
+        # V64: Robust Sanitization for non-standard JSON (handles -inf, inf, nan with any whitespace)
+        import re
+        raw_text = re.sub(r':\s*-?inf(inity)?\b', ': -999.0', raw_text, flags=re.IGNORECASE)
+        raw_text = re.sub(r':\s*nan\b', ': 0.0', raw_text, flags=re.IGNORECASE)
+        
+        # V66: Traces go to the in-memory ring (per request id) instead of last_*.json in the cwd
+        TRACES.record("raw_response", raw_text)
+        TRACES.record("model", route[0])
+        
+        if "```json" in raw_text:
+            raw_text = raw_text.split("```json")[1].split("```")[0].strip()
+        elif "```" in raw_text:
+            raw_text = raw_text.split("```")[1].split("```")[0].strip()
+        
+        data = json.loads(raw_text)
+        
+        # V65: Log the final processed spec for debugging
+        TRACES.record("model_json", data)
+        
+        # V40 Robustness: If AI returns a list, take the first element
+        if isinstance(data, list) and len(data) > 0:
+            data = data[0]
+        
+        if not isinstance(data, dict):
+            print(f"WARNING: AI returned non-dict JSON: {type(data)}")
+            return self._parse_with_regex(text)
+        
+        # V41 RESOLUTION ENGINE: Hyper-Robust Device Extraction
+        
+        # V42 INSTANCE-BASED RESOLUTION: Support multiple devices of same type
+        resolved_devices = []
+        valid_canonical_names = []
+        
+        # Helper to process any device entry and return its resolved state
+        def resolve_item(item):
+            if not item: return None
+            name = ""
+            params = {}
+            if isinstance(item, dict):
+                name = item.get("name") or item.get("target_device") or ""
+                params = item.get("parameters") or {}
+            elif isinstance(item, str):
+                name = item
             
-            # V41 RESOLUTION ENGINE: Hyper-Robust Device Extraction
-            
-            # V42 INSTANCE-BASED RESOLUTION: Support multiple devices of same type
-            resolved_devices = []
-            valid_canonical_names = []
-            
-            # Helper to process any device entry and return its resolved state
-            def resolve_item(item):
-                if not item: return None
-                name = ""
-                params = {}
-                if isinstance(item, dict):
-                    name = item.get("name") or item.get("target_device") or ""
-                    params = item.get("parameters") or {}
-                elif isinstance(item, str):
-                    name = item
-                
-                if name:
-                    canon = self.device_db.resolve_alias(str(name))
-                    if canon:
-                        return {"name": canon, "parameters": params}
-                return None
-
-            # Stage 1: Preserve order and multiplicity from AI "devices" list
-            raw_devs = data.get("devices", [])
-            if isinstance(raw_devs, str): raw_devs = [raw_devs]
+            if name:
+                canon = self.device_db.resolve_alias(str(name))
+                if canon:
+                    return {"name": canon, "parameters": params}
+            return None
+
+        # Stage 1: Preserve order and multiplicity from AI "devices" list
+        raw_devs = data.get("devices", [])
+        if isinstance(raw_devs, str): raw_devs = [raw_devs]
+        
+        for d in raw_devs:
+            resolved = resolve_item(d)
+            if resolved:
+                resolved_devices.append(resolved)
+                valid_canonical_names.append(resolved["name"])
+        
+        # Stage 2: Sync with surgical_devices (if AI provided specific initial states)
+        surg_devs = data.get("surgical_devices", [])
+        for s in surg_devs:
+            res_s = resolve_item(s)
+            if not res_s: continue
+            # Match by name and update existing resolved devices (first match that has empty params or same name)
+            # This is a heuristic: if AI listed devices then surgical_devices, we pair them up.
+            for r in resolved_devices:
+                if r["name"] == res_s["name"] and not r["parameters"]:
+                    r["parameters"].update(res_s["parameters"])
+                    break
+            else:
+                # If not found in primary list, add it as a new instance
+                resolved_devices.append(res_s)
+                valid_canonical_names.append(res_s["name"])
+
+        # Stage 3: Merge implicit devices from macro_details
+        for m in data.get("macro_details", []):
+            d_name = m.get("target_device")
+            if d_name:
+                canon = self.device_db.resolve_alias(d_name)
+                if canon and canon not in valid_canonical_names:
+                    resolved_devices.append({"name": canon, "parameters": {}})
+                    valid_canonical_names.append(canon)
+
+        # Deduplicate macro_details:
+        # Pass 1: Remove identical (macro, device, param) combos
+        # Pass 2: Remove cross-macro duplicates
+        raw_macro_details = data.get("macro_details", [])
+        seen_same_macro = set()
+        seen_cross_macro = set()
+        deduped_macro_details = []
+        for m in raw_macro_details:
+            macro_num = m.get("macro")
+            dev_key = str(m.get("target_device", "")).lower().strip()
+            param_key = str(m.get("target_parameter", "")).lower().strip()
             
-            for d in raw_devs:
-                resolved = resolve_item(d)
-                if resolved:
-                    resolved_devices.append(resolved)
-                    valid_canonical_names.append(resolved["name"])
+            same_key = (macro_num, dev_key, param_key)
+            cross_key = (dev_key, param_key)
             
-            # Stage 2: Sync with surgical_devices (if AI provided specific initial states)
-            surg_devs = data.get("surgical_devices", [])
-            for s in surg_devs:
-                res_s = resolve_item(s)
-                if not res_s: continue
-                # Match by name and update existing resolved devices (first match that has empty params or same name)
-                # This is a heuristic: if AI listed devices then surgical_devices, we pair them up.
-                for r in resolved_devices:
-                    if r["name"] == res_s["name"] and not r["parameters"]:
-                        r["parameters"].update(res_s["parameters"])
-                        break
-                else:
-                    # If not found in primary list, add it as a new instance
-                    resolved_devices.append(res_s)
-                    valid_canonical_names.append(res_s["name"])
-
-            # Stage 3: Merge implicit devices from macro_details
-            for m in data.get("macro_details", []):
-                d_name = m.get("target_device")
-                if d_name:
-                    canon = self.device_db.resolve_alias(d_name)
-                    if canon and canon not in valid_canonical_names:
-                        resolved_devices.append({"name": canon, "parameters": {}})
-                        valid_canonical_names.append(canon)
-
-            # Deduplicate macro_details:
-            # Pass 1: Remove identical (macro, device, param) combos
-            # Pass 2: Remove cross-macro duplicates
-            raw_macro_details = data.get("macro_details", [])
-            seen_same_macro = set()
-            seen_cross_macro = set()
-            deduped_macro_details = []
-            for m in raw_macro_details:
-                macro_num = m.get("macro")
-                dev_key = str(m.get("target_device", "")).lower().strip()
-                param_key = str(m.get("target_parameter", "")).lower().strip()
-                
-                same_key = (macro_num, dev_key, param_key)
-                cross_key = (dev_key, param_key)
-                
-                if same_key in seen_same_macro: continue
-                if cross_key in seen_cross_macro: continue
-                
-                seen_same_macro.add(same_key)
-                seen_cross_macro.add(cross_key)
-                deduped_macro_details.append(m)
+            if same_key in seen_same_macro: continue
+            if cross_key in seen_cross_macro: continue
             
-            return {
-                "creative_name": data.get("creative_name", "Precision Rack"),
-                "devices": valid_canonical_names,
-                "surgical_devices": resolved_devices, 
-                "macro_count": data.get("macro_count", 8),
-                "sound_intent": data.get("sound_intent", ""),
-                "macro_details": deduped_macro_details,
-                "ai_powered": True,
-                "model": self.model_id,
-                "explanation": data.get("explanation") or data.get("musical_logic_explanation", ""),
-                "tips": data.get("tips", [])
-            }
-        except Exception as e:
-            print(f"AI Parse failed: {e}")
-            return self._parse_with_regex(text)
+            seen_same_macro.add(same_key)
+            seen_cross_macro.add(cross_key)
+            deduped_macro_details.append(m)
+        
+        return {
+            "creative_name": data.get("creative_name", "Precision Rack"),
+            "devices": valid_canonical_names,
+            "surgical_devices": resolved_devices, 
+            "macro_count": data.get("macro_count", 8),
+            "sound_intent": data.get("sound_intent", ""),
+            "macro_details": deduped_macro_details,
+            "ai_powered": True,
+            "model": route[0],  # Routed model (fast or pro tier)
+            "complexity": route[1],
+            "explanation": data.get("explanation") or data.get("musical_logic_explanation", ""),
+            "tips": data.get("tips", [])
+        }
+
+    async def _stream_content(self, contents, config, model_id: str):
+        """Streaming Gemini call yielding text chunks, holds a concurrency slot until closed"""
+        async with self._ai_semaphore:
+            self._count_model_call(model_id)
+            stream = await self.client.aio.models.generate_content_stream(
+                model=model_id,
+                contents=contents,
+                config=config
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+
+    async def _generate_content(self, contents, config, model_id: Optional[str] = None):
+        """Non-blocking Gemini call, bounded by GEMINI_MAX_CONCURRENCY"""
+        async with self._ai_semaphore:
+            self._count_model_call(model_id or self.model_id)
+            return await self.client.aio.models.generate_content(
+                model=model_id or self.model_id,
+                contents=contents,
+                config=config
+            )
+
+    def _count_model_call(self, model_id: str):
+        if self.model_router is not None:
+            self.model_router.record_call(model_id)
+
+    def _prompt_devices(self, text: str) -> List[str]:
+        """Canonical devices named in the prompt, in prompt order"""
+        found = []
+        # Single pass, leftmost match wins and longer terms win at the same position
+        for match in self.device_pattern.finditer(text.lower()):
+            canon = self.device_terms.get(match.group(0))
+            if canon and canon not in found: found.append(canon)
+        return found
 
     def _parse_with_regex(self, text: str) -> Dict:
         """Deterministic fallback"""
         spec = {"devices": [], "macro_count": 8, "ai_powered": False}
-        text_lower = text.lower()
-        found = []
-        for pattern in self.device_patterns:
-             if re.search(r'\b' + pattern + r'\b', text_lower):
-                  term = pattern.replace('\\', '')
-                  canon = self.device_db.resolve_alias(term)
-                  if canon and canon not in found: found.append(canon)
+        found = self._prompt_devices(text)
         spec["devices"] = found
         spec["surgical_devices"] = [{"name": d, "parameters": {}} for d in found]
         return spec
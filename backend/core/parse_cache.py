@@ -0,0 +1,207 @@
+"""
+Parse Cache - LRU + on-disk cache of resolved rack specs for repeated prompts
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# A full disk tier is trimmed to this fraction of max_disk_entries, so the directory scan runs
+# once per ~10% of the budget in new writes instead of on every write
+DISK_LOW_WATER = 0.9
+
+
+def normalize_prompt(text: str) -> str:
+    """Case/whitespace-insensitive prompt form ('Warm  and FAT!' == 'warm and fat')"""
+    return " ".join(str(text).lower().split()).strip(" .!?")
+
+
+class ParseCache:
+    """Resolved specs keyed by (normalized prompt, model id, DB/knowledge version).
+
+    Memory holds the hottest entries, disk survives restarts and is shared by
+    workers. Both tiers honour the TTL; once disk exceeds max_disk_entries it
+    is trimmed by oldest access time down to the DISK_LOW_WATER mark.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 512, max_disk_entries: int = 5000,
+                 ttl_seconds: int = 7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._disk_lock = threading.Lock()  # Disk entry count and trimming (writers run in to_thread)
+        self._disk_count = None
+
+    @staticmethod
+    def make_key(prompt: str, model_id: str, version: str) -> str:
+        raw = json.dumps([normalize_prompt(prompt), model_id, version])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a private copy of the cached spec, or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry[0]):
+                    del self._memory[key]
+                else:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return copy.deepcopy(entry[1])
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: str, spec: Dict):
+        entry = (time.time(), copy.deepcopy(spec))
+        with self._lock:
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def _remember(self, key: str, entry: Tuple[float, Dict]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Dict]]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Dropping unreadable parse cache entry {key[:12]}: {e}")
+            self._remove(path)
+            return None
+        if self._expired(data.get("stored_at", 0)):
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # Access time drives disk LRU
+        except OSError:
+            pass
+        return data["stored_at"], data["spec"]
+
+    def _write_disk(self, key: str, entry: Tuple[float, Dict]):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            existed = os.path.exists(path)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"stored_at": entry[0], "spec": entry[1]}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Warning: Could not persist parse cache entry: {e}")
+            self._remove(tmp_path)
+            return
+        with self._disk_lock:
+            if self._disk_count is None:
+                self._disk_count = len(self._disk_entries())
+            elif not existed:
+                self._disk_count += 1
+            if self._disk_count > self.max_disk_entries:
+                self._trim_disk()
+
+    def _disk_entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if name.endswith(".json"):
+                    path = os.path.join(shard_dir, name)
+                    try:
+                        entries.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+        return entries
+
+    def _trim_disk(self):
+        """Drop expired entries, then the least recently used ones down to the low-water mark (under _disk_lock)"""
+        entries = sorted(self._disk_entries())
+        now = time.time()
+        keep = []
+        removed = 0
+        for mtime, path in entries:
+            if self.ttl_seconds > 0 and now - mtime > self.ttl_seconds:
+                self._remove(path)
+                removed += 1
+            else:
+                keep.append(path)
+        target = int(self.max_disk_entries * DISK_LOW_WATER)
+        overflow = max(0, len(keep) - target)
+        for path in keep[:overflow]:
+            self._remove(path)
+        self._disk_count = len(keep) - overflow
+        with self._lock:
+            self.evictions += removed + overflow
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    async def aget(self, key: str) -> Optional[Dict]:
+        """Event-loop friendly get: memory inline, disk in a worker thread"""
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None and not self._expired(entry[0]):
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, spec: Dict):
+        await asyncio.to_thread(self.put, key, spec)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self._disk_lock:
+            for _, path in self._disk_entries():
+                self._remove(path)
+            self._disk_count = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_count,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,132 @@
+"""
+Prompt Cache - Provider-side caching of the static system-prompt prefix
+"""
+
+import asyncio
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+# Refresh a cached context this many seconds before the provider expires it
+EXPIRY_MARGIN_S = 60
+# After a failed create, send the prefix inline for this long (doubled per repeated failure, capped)
+FAILURE_BACKOFF_S = 60
+MAX_FAILURE_BACKOFF_S = 3600
+
+
+class ContextCacheProvider(ABC):
+    """Registers a static prompt prefix once and hands out a reusable cache handle.
+
+    Creation is serialized per (model, prefix) only; a key whose create failed
+    (prefix below the provider minimum, model without caching) is skipped
+    until its backoff expires instead of retrying on every request. A handle
+    the provider dropped early is reported by the caller (is_stale_handle_error)
+    and invalidated, the next get_handle creates a fresh one.
+    """
+
+    def __init__(self, ttl_seconds: int = 3600):
+        self.ttl_seconds = ttl_seconds
+        self._handles: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._failed: Dict[Tuple[str, str], Tuple[float, float]] = {}  # key -> (retry_at, backoff_s)
+        self.created = 0
+        self.failures = 0
+        self.skipped = 0
+
+    @staticmethod
+    def prefix_hash(system_prompt: str) -> str:
+        return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+
+    async def get_handle(self, model_id: str, system_prompt: str) -> Optional[str]:
+        """Cache handle for (model, prefix); None means send the prefix inline"""
+        key = (model_id, self.prefix_hash(system_prompt))
+        cached = self._handles.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        if self._in_backoff(key):
+            return None
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._handles.get(key)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            if self._in_backoff(key):
+                return None  # Failed while we waited on the lock
+            try:
+                handle = await self._create(model_id, system_prompt, key[1])
+            except Exception as e:
+                # Typical causes: prefix below the provider minimum, model without caching support
+                self.failures += 1
+                previous = self._failed.get(key)
+                backoff = min(MAX_FAILURE_BACKOFF_S, previous[1] * 2) if previous else FAILURE_BACKOFF_S
+                self._failed[key] = (time.monotonic() + backoff, backoff)
+                print(f"Warning: Context cache unavailable, sending prompt inline for {backoff}s: {e}")
+                return None
+            self.created += 1
+            self._failed.pop(key, None)
+            self._handles[key] = (handle, time.monotonic() + max(0, self.ttl_seconds - EXPIRY_MARGIN_S))
+            return handle
+
+    def _in_backoff(self, key: Tuple[str, str]) -> bool:
+        failed = self._failed.get(key)
+        if failed and failed[0] > time.monotonic():
+            self.skipped += 1
+            return True
+        return False
+
+    def invalidate(self):
+        self._handles.clear()
+        self._failed.clear()
+
+    @staticmethod
+    def is_stale_handle_error(error: Exception) -> bool:
+        """Provider rejected a request because its cached context is gone (deleted or expired early)"""
+        message = str(error).lower().replace(" ", "").replace("_", "")
+        return "cachedcontent" in message or "cachecontent" in message
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "handles": len(self._handles),
+            "created": self.created,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "backing_off": sum(1 for retry_at, _ in self._failed.values() if retry_at > time.monotonic()),
+        }
+
+    @abstractmethod
+    async def _create(self, model_id: str, system_prompt: str, prefix_hash: str) -> str:
+        """Register the prefix with the provider, returns the handle requests reference"""
+
+
+class GeminiContextCache(ContextCacheProvider):
+    """Gemini explicit context caching (client.aio.caches)"""
+
+    def __init__(self, client, ttl_seconds: int = 3600):
+        super().__init__(ttl_seconds)
+        self.client = client
+
+    async def _create(self, model_id: str, system_prompt: str, prefix_hash: str) -> str:
+        from google.genai import types
+        cache = await self.client.aio.caches.create(
+            model=model_id,
+            config=types.CreateCachedContentConfig(
+                display_name=f"rack-generator-{prefix_hash}",
+                system_instruction=system_prompt,
+                ttl=f"{self.ttl_seconds}s",
+            )
+        )
+        return cache.name
+
+
+class LocalContextCache(ContextCacheProvider):
+    """In-memory stand-in for tests and offline runs: keeps the prefix, no network"""
+
+    def __init__(self, ttl_seconds: int = 3600):
+        super().__init__(ttl_seconds)
+        self.contexts: Dict[str, str] = {}
+
+    async def _create(self, model_id: str, system_prompt: str, prefix_hash: str) -> str:
+        handle = f"local/{model_id}/{prefix_hash}"
+        self.contexts[handle] = system_prompt
+        return handle
@@ -0,0 +1,255 @@
+"""
+Rack Factory - Parsed spec -> AudioEffectRack -> .adg bytes, no LLM involved
+
+Used by /generate after parsing, by /build for specs clients already have
+(replayed production specs, cached specs, builder load tests) and directly
+from Python:
+
+    from core.rack_factory import build_adg
+    data = build_adg({"devices": ["Compressor", "EQ Eight"]})
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from core.builder import AudioEffectRack, Chain
+from core.builder.constants import MAX_MACROS
+from core.device_mapper import DeviceDatabase
+
+# Limits for externally supplied specs (/build, build_adg); LLM specs stay far below these
+MAX_CHAINS = 16
+MAX_SPEC_DEVICES = 64
+
+_default_db: Optional[DeviceDatabase] = None
+_default_db_lock = threading.Lock()
+
+
+def default_device_db() -> DeviceDatabase:
+    """Process-wide DeviceDatabase, loaded on first use"""
+    global _default_db
+    with _default_db_lock:
+        if _default_db is None:
+            _default_db = DeviceDatabase()
+        return _default_db
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_macro_count(value, where: str):
+    if not _is_int(value) or not 1 <= value <= MAX_MACROS:
+        raise ValueError(f"{where} must be an integer between 1 and {MAX_MACROS}")
+
+
+def validate_spec(spec, macro_count: Optional[int] = None) -> dict:
+    """Shape check for externally supplied specs, raises ValueError with a readable reason.
+
+    Everything the builder reads is type-checked here so bad input is a 422,
+    never a traceback from deep inside auto_map_macros.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("spec must be a JSON object")
+    for key in ("devices", "surgical_devices", "macro_details"):
+        if not isinstance(spec.get(key, []), list):
+            raise ValueError(f"spec.{key} must be a list")
+
+    if "creative_name" in spec and not isinstance(spec["creative_name"], str):
+        raise ValueError("spec.creative_name must be a string")
+    if "macro_count" in spec:
+        _check_macro_count(spec["macro_count"], "spec.macro_count")
+    if macro_count is not None:
+        _check_macro_count(macro_count, "macro_count")
+    chains = spec.get("chains", 1)
+    if not _is_int(chains) or not 1 <= chains <= MAX_CHAINS:
+        raise ValueError(f"spec.chains must be an integer between 1 and {MAX_CHAINS}")
+
+    for i, dev in enumerate(spec.get("devices", [])):
+        name = dev.get("name") if isinstance(dev, dict) else dev
+        if not isinstance(name, str) or not name.strip():
+            raise ValueError(f"spec.devices[{i}] must be a device name or {{\"name\": str}}")
+
+    for i, item in enumerate(spec.get("macro_details", [])):
+        where = f"spec.macro_details[{i}]"
+        if not isinstance(item, dict):
+            raise ValueError(f"{where} must be an object")
+        for key in ("target_device", "target_parameter"):
+            if item.get(key) is not None and not isinstance(item[key], str):
+                raise ValueError(f"{where}.{key} must be a string")  # Missing ones are skipped by the builder
+        if item.get("macro") is not None and (not _is_int(item["macro"]) or not 1 <= item["macro"] <= MAX_MACROS):
+            raise ValueError(f"{where}.macro must be an integer between 1 and {MAX_MACROS}")
+        for key in ("name", "label", "description"):
+            if item.get(key) is not None and not isinstance(item[key], str):
+                raise ValueError(f"{where}.{key} must be a string")
+        for key in ("min", "max"):
+            if key in item and not _is_number(item[key]):
+                raise ValueError(f"{where}.{key} must be a number")
+
+    for i, s_dev in enumerate(spec.get("surgical_devices", [])):
+        where = f"spec.surgical_devices[{i}]"
+        if not isinstance(s_dev, dict) or not isinstance(s_dev.get("name"), str):
+            raise ValueError(f"{where} must be an object with a string name")
+        params = s_dev.get("parameters", {})
+        if not isinstance(params, dict):
+            raise ValueError(f"{where}.parameters must be an object")
+        for p_name, p_val in params.items():
+            if not isinstance(p_val, (int, float, str)):
+                raise ValueError(f"{where}.parameters.{p_name} must be a number, boolean or string")
+
+    device_names = spec_device_names(spec)
+    if not device_names:
+        raise ValueError("spec contains no devices")
+    if len(device_names) > MAX_SPEC_DEVICES:
+        raise ValueError(f"spec names {len(device_names)} devices, at most {MAX_SPEC_DEVICES} are supported")
+    return spec
+
+
+def spec_device_names(spec: dict) -> List[str]:
+    """Every device the rack needs: devices, then macro plan targets, then surgical devices"""
+    all_required_devices = []
+
+    # Extract from 'devices' list (can be [str] or [{"name": str}])
+    for dev in spec.get("devices", []):
+        d_name = dev.get("name") if isinstance(dev, dict) else dev
+        if d_name and d_name not in all_required_devices:
+            all_required_devices.append(d_name)
+
+    # Extract from macro plan
+    for plan_item in spec.get("macro_details", []):
+        dev_name = plan_item.get("target_device") if isinstance(plan_item, dict) else None
+        if dev_name and dev_name not in all_required_devices:
+            all_required_devices.append(dev_name)
+
+    # Extract from surgical_devices
+    for s_dev in spec.get("surgical_devices", []):
+        dev_name = s_dev.get("name") if isinstance(s_dev, dict) else None
+        if dev_name and dev_name not in all_required_devices:
+            all_required_devices.append(dev_name)
+    return all_required_devices
+
+
+def build_rack(spec: dict, device_db: Optional[DeviceDatabase] = None,
+               macro_count: Optional[int] = None) -> AudioEffectRack:
+    """Chains, devices and macro mappings for a parsed spec"""
+    # Create rack
+    rack = AudioEffectRack(name="Custom Rack", device_db=device_db or default_device_db())
+
+    # 3. Build chains based on topology and macro plan (V18 String-Strict Collection)
+    all_required_devices = spec_device_names(spec)
+
+    num_chains = spec.get("chains", 1)
+    if num_chains < 1: num_chains = 1
+
+    # Parallel Distribution: If we have multiple chains, distribute devices
+    for i in range(num_chains):
+        chain_name = f"Chain {i+1}" if num_chains > 1 else "Main Chain"
+        chain = Chain(name=chain_name)
+
+        # Divide devices among chains if Parallel, otherwise put all in first chain
+        if i == 0 or num_chains > 1:
+            devices_for_this_chain = []
+            if num_chains == 1:
+                devices_for_this_chain = all_required_devices
+            else:
+                # Basic distribution: if we have 4 devices and 2 chains, put 2 in each
+                # Or just follow the first chain convention for now, but safer to distribute
+                chunk_size = max(1, len(all_required_devices) // num_chains)
+                start_idx = i * chunk_size
+                end_idx = start_idx + chunk_size if i < num_chains - 1 else len(all_required_devices)
+                devices_for_this_chain = all_required_devices[start_idx:end_idx]
+
+            for device_name in devices_for_this_chain:
+                try:
+                    device = rack.create_device(device_name)
+                    chain.add_device(device)
+                except Exception as e:
+                    print(f"WARNING: Skipping device '{device_name}': {str(e)}")
+
+        rack.add_chain(chain)
+
+    # Set macro count
+    rack.macro_count = macro_count or spec.get("macro_count", 8)
+
+    # Auto-generate macro mappings and initialize parameters (Surgical V5)
+    rack.auto_map_macros(spec)
+    return rack
+
+
+def rack_file_stem(spec: dict) -> str:
+    """Filesystem-safe stem from the spec's creative name"""
+    creative_name = spec.get("creative_name", "Custom Rack")
+    return "".join(x for x in creative_name if x.isalnum() or x in " -_").replace(" ", "_")
+
+
+def rack_adg_bytes(rack: AudioEffectRack, spec: dict, compression: str = "max") -> Tuple[str, bytes]:
+    """(file stem, .adg bytes); the gzip header carries the name up to the first '_'"""
+    clean_name = rack_file_stem(spec)
+    return clean_name, rack.to_adg_bytes(f"{clean_name}_.adg", compression=compression)
+
+
+def build_adg(spec: dict, macro_count: Optional[int] = None, compression: str = "max",
+              device_db: Optional[DeviceDatabase] = None) -> bytes:
+    """Spec in, .adg bytes out (validated, same pipeline as /generate)"""
+    validate_spec(spec, macro_count)
+    rack = build_rack(spec, device_db, macro_count)
+    return rack_adg_bytes(rack, spec, compression)[1]
+
+
+@dataclass
+class RenderedRack:
+    """Picklable result of a build (what a worker process sends back instead of the rack tree)"""
+    stem: str
+    data: bytes
+    macro_count: int
+    chains: List[dict]  # [{"name": str, "devices": [str]}]
+    macro_details: List[dict]
+
+
+def render_rack(spec: dict, macro_count: Optional[int] = None, compression: str = "max",
+                device_db: Optional[DeviceDatabase] = None) -> RenderedRack:
+    """Build + serialize in one call, safe to run in a worker process"""
+    rack = build_rack(spec, device_db, macro_count)
+    stem, data = rack_adg_bytes(rack, spec, compression)
+    return RenderedRack(
+        stem=stem,
+        data=data,
+        macro_count=rack.macro_count,
+        chains=[{"name": chain.name, "devices": [d.name for d in chain.devices]} for chain in rack.chains],
+        macro_details=macro_details(rack),
+    )
+
+
+def macro_details(rack: AudioEffectRack) -> List[dict]:
+    """Actual macro mappings in frontend format"""
+    # Convert rack.macro_mappings to frontend format
+    actual_macro_details = []
+    for mapping in rack.macro_mappings:
+        # Find the device name from the rack
+        device_name = ""
+        for chain in rack.chains:
+            for device in chain.devices:
+                # Check if this mapping belongs to this device
+                if tuple(mapping.param_path) in device.mappings:
+                    device_name = device.name
+                    break
+            if device_name:
+                break
+
+        actual_macro_details.append({
+            "macro": mapping.macro_index + 1,  # 1-indexed for display
+            "name": mapping.label or mapping.param_path[-1],
+            "description": f"Controls the {mapping.param_path[-1]} parameter.",
+            "target_device": device_name,
+            "target_parameter": mapping.param_path[-1],
+            "min": mapping.min_val,
+            "max": mapping.max_val
+        })
+
+    # Sort by macro index for correct UI display order
+    actual_macro_details.sort(key=lambda x: x["macro"])
+    return actual_macro_details
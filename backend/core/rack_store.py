@@ -0,0 +1,203 @@
+"""
+Rack Store - Content-addressed storage of generated .adg files with an LRU byte/count budget
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Only names the store itself produces (or legacy generated/*.adg) are ever resolved
+SAFE_FILENAME = re.compile(r'^[\w -]+\.adg$')
+
+# Other uvicorn workers write to the same directory: re-read it at least this often before evicting
+SCAN_INTERVAL_S = 30.0
+
+
+class RackStore:
+    """generated/ as a cache: '{name}_{sha256[:16]}.adg', identical racks share one file.
+
+    The index (filename -> size) is ordered by last access and rebuilt from the
+    directory (mtime order) at startup, whenever it is over budget and every
+    scan_interval_s, so workers sharing the directory enforce one budget (at
+    most one interval's worth of writes over it);
+    put/resolve touch entries (mtime too), eviction drops the least recently
+    used files. resolve adopts files another worker wrote. Recently written
+    racks are also kept in memory (hot_max_bytes) so the /download that follows
+    /generate never touches the disk.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024, max_files: int = 5000,
+                 hot_max_bytes: int = 64 * 1024 * 1024, scan_interval_s: float = SCAN_INTERVAL_S):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.hot_max_bytes = hot_max_bytes
+        self.scan_interval_s = scan_interval_s
+        self._next_scan = 0.0
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._hot: "OrderedDict[str, bytes]" = OrderedDict()
+        self._hot_bytes = 0
+        self.hot_hits = 0
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+        self.evictions = 0
+        self.scans = 0
+        self.adopted = 0
+        os.makedirs(root, exist_ok=True)
+        with self._lock:
+            self._rescan()
+            self._evict()
+
+    def _rescan(self):
+        """Rebuild the index from the directory, the view every worker shares (caller holds the lock)"""
+        entries = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if not SAFE_FILENAME.match(entry.name):
+                    continue
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.name, st.st_size))
+                except OSError:
+                    pass  # Removed by another worker mid-scan
+        self._index = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self._bytes = sum(self._index.values())
+        for filename in [f for f in self._hot if f not in self._index]:
+            self._hot_bytes -= len(self._hot.pop(filename))
+        self._next_scan = time.monotonic() + self.scan_interval_s
+        self.scans += 1
+
+    def _over_budget(self) -> bool:
+        return self._bytes > self.max_bytes or len(self._index) > self.max_files
+
+    @staticmethod
+    def content_name(data: bytes, name_hint: str) -> str:
+        return f"{name_hint}_{hashlib.sha256(data).hexdigest()[:16]}.adg"
+
+    @staticmethod
+    def etag(filename: str, path: Optional[str] = None) -> str:
+        """Strong ETag: the content hash in the name, or size+mtime for legacy files"""
+        digest = filename[:-4].rsplit('_', 1)[-1]
+        if len(digest) == 16 and all(c in "0123456789abcdef" for c in digest):
+            return f'"{digest}"'
+        st = os.stat(path)
+        return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+    def put(self, data: bytes, name_hint: str) -> str:
+        """Store .adg bytes, returns the content-addressed filename (existing file reused)"""
+        filename = self.content_name(data, name_hint)
+        path = os.path.join(self.root, filename)
+        with self._lock:
+            if filename in self._index and os.path.exists(path):
+                self.deduplicated += 1
+                self._touch(filename, path)
+                self._remember_hot(filename, data)
+                return filename
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if filename not in self._index:
+                self._bytes += len(data)
+            self._index[filename] = len(data)
+            if self._over_budget() or time.monotonic() >= self._next_scan:
+                self._rescan()  # Count what the other workers wrote before deciding what to drop
+            if filename in self._index:
+                self._index.move_to_end(filename)
+            self._evict(keep=filename)
+            self._remember_hot(filename, data)
+        return filename
+
+    def hot_bytes(self, filename: str) -> Optional[bytes]:
+        """Rack bytes from memory if still hot (no disk access), else None"""
+        with self._lock:
+            data = self._hot.get(filename)
+            if data is None or filename not in self._index:
+                return None
+            self._hot.move_to_end(filename)
+            self._index.move_to_end(filename)
+            self.hot_hits += 1
+            return data
+
+    def _remember_hot(self, filename: str, data: bytes):
+        if len(data) > self.hot_max_bytes:
+            return
+        if filename not in self._hot:
+            self._hot_bytes += len(data)
+        self._hot[filename] = data
+        self._hot.move_to_end(filename)
+        while self._hot_bytes > self.hot_max_bytes:
+            _, old = self._hot.popitem(last=False)
+            self._hot_bytes -= len(old)
+
+    def resolve(self, filename: str) -> Optional[str]:
+        """Path of a stored rack, or None (missing, evicted or unsafe name)"""
+        if not SAFE_FILENAME.match(filename):
+            return None
+        path = os.path.join(self.root, filename)
+        with self._lock:
+            if filename not in self._index:
+                # Written by another worker (or after startup): adopt it, the next put re-checks the budget
+                try:
+                    if not os.path.isfile(path):
+                        return None
+                    size = os.path.getsize(path)
+                except OSError:
+                    return None
+                self._index[filename] = size
+                self._bytes += size
+                self.adopted += 1
+            elif not os.path.exists(path):
+                self._bytes -= self._index.pop(filename)
+                old = self._hot.pop(filename, None)
+                if old is not None:
+                    self._hot_bytes -= len(old)
+                return None
+            self._touch(filename, path)
+        return path
+
+    def _touch(self, filename: str, path: str):
+        self._index.move_to_end(filename)
+        try:
+            os.utime(path)  # Keeps LRU order across restarts
+        except OSError:
+            pass
+
+    def _evict(self, keep: Optional[str] = None):
+        while self._index and self._over_budget():
+            filename, size = next(iter(self._index.items()))
+            if filename == keep:
+                break
+            del self._index[filename]
+            self._bytes -= size
+            self.evictions += 1
+            old = self._hot.pop(filename, None)
+            if old is not None:
+                self._hot_bytes -= len(old)
+            try:
+                os.remove(os.path.join(self.root, filename))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "files": len(self._index),
+                "bytes": self._bytes,
+                "max_files": self.max_files,
+                "max_bytes": self.max_bytes,
+                "deduplicated": self.deduplicated,
+                "evictions": self.evictions,
+                "adopted": self.adopted,
+                "scans": self.scans,
+                "hot_files": len(self._hot),
+                "hot_bytes": self._hot_bytes,
+                "hot_hits": self.hot_hits,
+            }
@@ -0,0 +1,58 @@
+"""
+Single Flight - Coalesce identical concurrent async calls into one execution
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+class SingleFlight:
+    """In-flight registry: the first caller for a key runs the work, duplicates await its result.
+
+    The work runs as its own task, so a leader that disconnects does not cancel
+    the result its followers are waiting for. Once every waiter is gone the work
+    is cancelled. Exceptions are shared the same way.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, List] = {}  # key -> [task, waiters]
+        self.executions = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._inflight.get(key)
+        if entry is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            entry = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _t, k=key: self._forget(k, _t))
+        else:
+            self.coalesced += 1
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                # Last interested caller left (client disconnect): stop paying for the work
+                task.cancel()
+                self.cancelled += 1
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]  # A new caller starts fresh instead of joining a dying task
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved, waiters already got it
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+        }
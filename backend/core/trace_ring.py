@@ -0,0 +1,119 @@
+"""
+Trace Ring - Bounded in-memory debug traces per request (replaces last_*.json dumps)
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# Request id of the generation running in the current task (inherited by child tasks)
+current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+
+
+class TraceRing:
+    """Last N request traces in memory, optionally spilled to disk by a background writer.
+
+    Recording never touches the disk on the caller's path: finished traces are
+    queued and written by one asyncio task via a worker thread.
+    """
+
+    def __init__(self, capacity: int = 200, spill_dir: Optional[str] = None):
+        self.capacity = capacity
+        self.spill_dir = spill_dir
+        self._traces: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._spill_queue: Optional[asyncio.Queue] = None
+        self._spill_task: Optional[asyncio.Task] = None
+        self.spilled = 0
+        self.spill_errors = 0
+
+    def begin(self, prompt: str, **fields) -> str:
+        """Open a trace for a new request and make it current for this task"""
+        request_id = uuid.uuid4().hex[:16]
+        self._traces[request_id] = {"request_id": request_id, "created": time.time(), "prompt": prompt, **fields}
+        while len(self._traces) > self.capacity:
+            self._traces.popitem(last=False)
+        current_request_id.set(request_id)
+        return request_id
+
+    def record(self, key: str, value: Any, request_id: Optional[str] = None):
+        """Attach a value to the current (or given) request's trace; no-op outside a request"""
+        trace = self._traces.get(request_id or current_request_id.get())
+        if trace is not None:
+            trace[key] = value
+
+    def finish(self, request_id: Optional[str] = None, **fields):
+        request_id = request_id or current_request_id.get()
+        trace = self._traces.get(request_id)
+        if trace is None:
+            return
+        trace.update(fields)
+        trace["elapsed_ms"] = round((time.time() - trace["created"]) * 1000.0, 1)
+        if self.spill_dir:
+            self._enqueue_spill(dict(trace))
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        trace = self._traces.get(request_id)
+        return dict(trace) if trace is not None else None
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Newest first, summary fields only"""
+        items = list(self._traces.values())[-limit:]
+        return [
+            {k: t.get(k) for k in ("request_id", "created", "prompt", "elapsed_ms", "status")}
+            for t in reversed(items)
+        ]
+
+    def _enqueue_spill(self, trace: Dict[str, Any]):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sync caller (scripts): memory only
+        if self._spill_queue is None:
+            self._spill_queue = asyncio.Queue(maxsize=self.capacity)
+        if self._spill_task is None or self._spill_task.done():
+            self._spill_task = loop.create_task(self._spill_worker())
+        try:
+            self._spill_queue.put_nowait(trace)
+        except asyncio.QueueFull:
+            self.spill_errors += 1  # Disk is behind, the ring still has it
+
+    async def _spill_worker(self):
+        while True:
+            trace = await self._spill_queue.get()
+            try:
+                await asyncio.to_thread(self._write_trace, trace)
+                self.spilled += 1
+            except Exception as e:
+                self.spill_errors += 1
+                print(f"Warning: Could not spill trace {trace.get('request_id')}: {e}")
+            finally:
+                self._spill_queue.task_done()
+
+    def _write_trace(self, trace: Dict[str, Any]):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"{trace['request_id']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, indent=2, default=str)
+
+    def configure(self, capacity: Optional[int] = None, spill_dir: Optional[str] = None):
+        if capacity is not None:
+            self.capacity = capacity
+        self.spill_dir = spill_dir
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "traces": len(self._traces),
+            "capacity": self.capacity,
+            "spill_dir": self.spill_dir,
+            "spilled": self.spilled,
+            "spill_errors": self.spill_errors,
+        }
+
+
+# Process-wide ring shared by the parser and the API (sized from env in main.py)
+TRACES = TraceRing()
@@ -4,24 +4,43 @@ Ableton Rack Generator - FastAPI Backend
 Main application entry point
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+from contextlib import aclosing, asynccontextmanager
+import asyncio
+import base64
+import json
 import os
 import tempfile
 import time
 
-from core.builder import AudioEffectRack, Chain, AbletonDevice
+from core.builder import DEVICE_FRAGMENT_CACHE, resolve_compresslevel
+from core.rack_factory import RenderedRack, default_device_db, render_rack, validate_spec
+from core.build_pool import BuildPool
 from core.nlp_parser import RackNLPParser
-from core.device_mapper import DeviceDatabase
+from core.parse_cache import normalize_prompt
+from core.single_flight import SingleFlight
+from core.trace_ring import TRACES, current_request_id
+from core.rack_store import RackStore
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Worker pools are created lazily below; stop them with the app
+    build_pool.shutdown()
+    batch_build_pool.shutdown()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Ableton Rack Generator API",
     description="Generate .adg Effect Racks from natural language",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend
@@ -39,17 +58,75 @@ print(" STARTING NEW BACKEND INSTANCE (VQA FIXED) ")
 print(f"Timestamp: {time.ctime()}")
 print("="*50 + "\n")
 
-device_db = DeviceDatabase()
+device_db = default_device_db()  # Shared with build pool threads
 nlp_parser = RackNLPParser(device_db)
 
+# .adg gzip profile: fast | balanced | max (default, smallest files)
+ADG_COMPRESSION = os.getenv("ADG_COMPRESSION", "max")
+resolve_compresslevel(ADG_COMPRESSION)  # Fail fast on a typo
+
+# V66: generated/ is a content-addressed store with an LRU budget (dedup, bounded disk)
+rack_store = RackStore(
+    os.path.join(os.path.dirname(__file__), "generated"),
+    max_bytes=int(os.getenv("RACK_STORE_MAX_MB", "512")) * 1024 * 1024,
+    max_files=int(os.getenv("RACK_STORE_MAX_FILES", "5000")),
+    hot_max_bytes=int(os.getenv("RACK_HOT_CACHE_MB", "64")) * 1024 * 1024,
+)
+
+# V66: Recent request traces (raw model output, spec) live in memory, optional spill to disk
+TRACES.configure(capacity=int(os.getenv("TRACE_RING_SIZE", "200")), spill_dir=os.getenv("TRACE_SPILL_DIR") or None)
+TRACE_ENDPOINT_ENABLED = os.getenv("TRACE_ENDPOINT", "0") == "1"
+
+# V66: Identical concurrent /generate calls (double clicks, viral prompts) share one parse + build
+generate_flight = SingleFlight()
+
+NO_DEVICES_DETAIL = "No devices found in prompt. Try: 'rack with compressor and EQ'"
+
+# V66: Abandoned requests (tab closed, caller timeout) stop paying for LLM, CPU and disk
+DISCONNECT_POLL_S = 0.5
+client_disconnects = 0
+
+# V66: Build + serialize (chains, auto_map_macros, to_xml, gzip) run on a worker pool, never on the event loop
+build_pool = BuildPool(
+    os.getenv("BUILD_POOL", "thread"),
+    int(os.getenv("BUILD_POOL_WORKERS", "0")) or None,
+    initializer=default_device_db,
+)
+
+# V66: /generate/batch - bounded parse fan-out per batch, builds in worker processes (0 = shared build pool)
+BATCH_PARSE_CONCURRENCY = max(1, int(os.getenv("BATCH_PARSE_CONCURRENCY", "4")))
+BATCH_BUILD_WORKERS = int(os.getenv("BATCH_BUILD_WORKERS", str(min(4, os.cpu_count() or 1))))
+BATCH_MAX_PROMPTS = int(os.getenv("BATCH_MAX_PROMPTS", "100"))
+batch_build_pool = (
+    BuildPool("process", BATCH_BUILD_WORKERS, initializer=default_device_db, name="batch")
+    if BATCH_BUILD_WORKERS > 0 else build_pool
+)
+
 
 # Models
 class GenerateRequest(BaseModel):
     """Request model for rack generation"""
     prompt: str
     macro_count: Optional[int] = 8
+    deadline_s: Optional[float] = None  # Parse latency budget, falls back to regex when exceeded
+    inline: Optional[bool] = False  # Also return the .adg bytes (base64) so no /download round-trip is needed
     
 
+class BatchGenerateRequest(BaseModel):
+    """Request model for generating many racks in one call"""
+    prompts: List[str]
+    macro_count: Optional[int] = 8
+    deadline_s: Optional[float] = None
+    inline: Optional[bool] = False
+
+
+class BuildRequest(BaseModel):
+    """Request model for building a rack from an already parsed spec (no LLM call)"""
+    spec: dict  # Same shape nlp_parser.parse returns: devices, surgical_devices, macro_details...
+    macro_count: Optional[int] = None  # Defaults to spec.macro_count, then 8
+    inline: Optional[bool] = False
+
+
 class DeviceInfo(BaseModel):
     """Device information model"""
     name: str
@@ -70,6 +147,8 @@ class RackInfo(BaseModel):
     parallel_logic: Optional[str] = ""
     tips: Optional[List[str]] = []
     explanation: Optional[str] = ""
+    request_id: Optional[str] = None  # Key for /debug/traces/{request_id}
+    adg_base64: Optional[str] = None  # Only with inline=true
 
 
 # Routes
@@ -99,166 +178,361 @@ async def list_devices():
 
 
 @app.post("/generate", response_model=RackInfo)
-async def generate_rack(request: GenerateRequest):
+async def generate_rack(request: GenerateRequest, http_request: Request):
     """
     Generate .adg file from natural language prompt
     """
+    flight_key = (normalize_prompt(request.prompt), request.macro_count, request.deadline_s, bool(request.inline))
+    work = asyncio.ensure_future(generate_flight.do(flight_key, lambda: _generate_rack(request)))
+    return await _cancel_on_disconnect(http_request, work)
+
+
+async def _cancel_on_disconnect(http_request: Request, work: asyncio.Future):
+    """Await work, cancelling it (and through it the LLM call and build) if the client goes away"""
+    global client_disconnects
+    try:
+        while True:
+            done, _ = await asyncio.wait({work}, timeout=DISCONNECT_POLL_S)
+            if done:
+                return work.result()
+            if await http_request.is_disconnected():
+                client_disconnects += 1
+                print("🔌 CLIENT DISCONNECTED: cancelling generation")
+                work.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not work.done():
+            work.cancel()
+
+
+async def _generate_rack(request: GenerateRequest) -> RackInfo:
+    """Parse + build + save, executed once per in-flight key"""
+    TRACES.begin(request.prompt, endpoint="/generate")
     try:
         print(f"👉 RECEIVED REQUEST: {request.prompt}")
         
         # Parse prompt (now async for AI)
-        spec = await nlp_parser.parse(request.prompt)
+        spec = await nlp_parser.parse(request.prompt, deadline_s=request.deadline_s, macro_count=request.macro_count)
+        TRACES.record("spec", spec)
         print(f"🤖 AI PARSED: {spec['devices']}")
         
         if not spec["devices"]:
             raise HTTPException(
                 status_code=400,
-                detail="No devices found in prompt. Try: 'rack with compressor and EQ'"
+                detail=NO_DEVICES_DETAIL
             )
         
-        # Create rack
-        rack = AudioEffectRack(name="Custom Rack", device_db=device_db)
-        
-        # 3. Build chains based on topology and macro plan (V18 String-Strict Collection)
-        all_required_devices = []
-        
-        # Extract from 'devices' list (can be [str] or [{"name": str}])
-        for dev in spec.get("devices", []):
-            d_name = dev.get("name") if isinstance(dev, dict) else dev
-            if d_name and d_name not in all_required_devices:
-                all_required_devices.append(d_name)
-        
-        # Extract from macro plan
-        for plan_item in spec.get("macro_details", []):
-            dev_name = plan_item.get("target_device")
-            if dev_name and dev_name not in all_required_devices:
-                all_required_devices.append(dev_name)
-        
-        # Extract from surgical_devices
-        for s_dev in spec.get("surgical_devices", []):
-            dev_name = s_dev.get("name")
-            if dev_name and dev_name not in all_required_devices:
-                all_required_devices.append(dev_name)
-
-        num_chains = spec.get("chains", 1)
-        if num_chains < 1: num_chains = 1
+        rendered = await _render_rack(spec, request.macro_count)
+        await asyncio.sleep(0)  # Cancellation point before anything is written to disk
+        filename = await _store_rack(rendered)
+        TRACES.finish(status="ok", filename=filename)
+        return _rack_info(rendered, spec, filename, rendered.data if request.inline else None)
         
-        # Parallel Distribution: If we have multiple chains, distribute devices
-        for i in range(num_chains):
-            chain_name = f"Chain {i+1}" if num_chains > 1 else "Main Chain"
-            chain = Chain(name=chain_name)
-            
-            # Divide devices among chains if Parallel, otherwise put all in first chain
-            if i == 0 or num_chains > 1:
-                devices_for_this_chain = []
-                if num_chains == 1:
-                    devices_for_this_chain = all_required_devices
+    except asyncio.CancelledError:
+        TRACES.finish(status="cancelled")
+        raise
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        TRACES.finish(status="error", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _render_rack(spec: dict, macro_count: Optional[int], pool: Optional[BuildPool] = None) -> RenderedRack:
+    """Chains, macro mappings and .adg bytes for a parsed spec, built on the worker pool"""
+    return await (pool or build_pool).run(render_rack, spec, macro_count, ADG_COMPRESSION)
+
+
+async def _store_rack(rendered: RenderedRack) -> str:
+    """Store the .adg in the rack store, returns the content-addressed filename"""
+    filename = await asyncio.to_thread(rack_store.put, rendered.data, rendered.stem)
+    print(f"✅ FILE GENERATED: {filename}")
+    return filename
+
+
+def _rack_info(rendered: RenderedRack, spec: dict, filename: str, data: Optional[bytes] = None) -> RackInfo:
+    return RackInfo(
+        filename=filename,
+        creative_name=spec.get("creative_name", "Custom Rack"),
+        devices=[d.get("name") if isinstance(d, dict) else d for d in spec.get("devices", [])],
+        macro_count=rendered.macro_count,
+        chains=len(rendered.chains),
+        sound_intent=spec.get("sound_intent", ""),
+        macro_details=rendered.macro_details,  # Use actual mapped macros, not AI spec
+        parallel_logic=spec.get("parallel_logic", ""),
+        tips=spec.get("tips", []),
+        explanation=spec.get("explanation", ""),
+        request_id=current_request_id.get(),
+        adg_base64=base64.b64encode(data).decode('ascii') if data is not None else None
+    )
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@app.post("/generate/stream")
+async def generate_rack_stream(request: GenerateRequest, http_request: Request):
+    """
+    Generate .adg file with server-sent progress events:
+    device* (while the model writes), spec, devices, macros, ready | error
+    """
+    return StreamingResponse(
+        _generate_events(request, http_request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _generate_events(request: GenerateRequest, http_request: Request):
+    global client_disconnects
+    # Explicit id: a disconnect closes this generator from outside the task that began the trace
+    request_id = TRACES.begin(request.prompt, endpoint="/generate/stream")
+    try:
+        print(f"👉 RECEIVED STREAM REQUEST: {request.prompt}")
+        spec = None
+        # aclosing: a disconnect cancels us mid-stream, the LLM stream must be closed right away
+        async with aclosing(nlp_parser.parse_stream(request.prompt, deadline_s=request.deadline_s, macro_count=request.macro_count)) as events:
+            async for event, payload in events:
+                if event == "device":
+                    yield _sse("device", {"name": payload})
                 else:
-                    # Basic distribution: if we have 4 devices and 2 chains, put 2 in each
-                    # Or just follow the first chain convention for now, but safer to distribute
-                    chunk_size = max(1, len(all_required_devices) // num_chains)
-                    start_idx = i * chunk_size
-                    end_idx = start_idx + chunk_size if i < num_chains - 1 else len(all_required_devices)
-                    devices_for_this_chain = all_required_devices[start_idx:end_idx]
-
-                for device_name in devices_for_this_chain:
-                    try:
-                        device = rack.create_device(device_name)
-                        chain.add_device(device)
-                    except Exception as e:
-                        print(f"WARNING: Skipping device '{device_name}': {str(e)}")
-            
-            rack.add_chain(chain)
-        
-        # Set macro count
-        rack.macro_count = request.macro_count or spec.get("macro_count", 8)
-        
-        # Auto-generate macro mappings and initialize parameters (Surgical V5)
-        rack.auto_map_macros(spec)
-        
-        # Ensure 'generated' directory exists
-        gen_dir = os.path.join(os.path.dirname(__file__), "generated")
-        os.makedirs(gen_dir, exist_ok=True)
-        
-        # Generate filename based on creative name
-        creative_name = spec.get("creative_name", "Custom Rack")
-        clean_name = "".join(x for x in creative_name if x.isalnum() or x in " -_").replace(" ", "_")
-        filename = f"{clean_name}_{os.urandom(2).hex()}.adg"
-        filepath = os.path.join(gen_dir, filename)
-        
-        rack.save(filepath)
-        print(f"✅ FILE GENERATED: {filename}")
-        
-        # Convert rack.macro_mappings to frontend format
-        actual_macro_details = []
-        for mapping in rack.macro_mappings:
-            # Find the device name from the rack
-            device_name = ""
-            for chain in rack.chains:
-                for device in chain.devices:
-                    # Check if this mapping belongs to this device
-                    if tuple(mapping.param_path) in device.mappings:
-                        device_name = device.name
-                        break
-                if device_name:
-                    break
-            
-            actual_macro_details.append({
-                "macro": mapping.macro_index + 1,  # 1-indexed for display
-                "name": mapping.label or mapping.param_path[-1],
-                "description": f"Controls the {mapping.param_path[-1]} parameter.",
-                "target_device": device_name,
-                "target_parameter": mapping.param_path[-1],
-                "min": mapping.min_val,
-                "max": mapping.max_val
-            })
-        
-        # Sort by macro index for correct UI display order
-        actual_macro_details.sort(key=lambda x: x["macro"])
-        
-        # Return info to frontend
-        return RackInfo(
-            filename=filename,
-            creative_name=creative_name,
-            devices=spec["devices"],
-            macro_count=rack.macro_count,
-            chains=len(rack.chains),
-            sound_intent=spec.get("sound_intent", ""),
-            macro_details=actual_macro_details,  # Use actual mapped macros, not AI spec
-            parallel_logic=spec.get("parallel_logic", ""),
-            tips=spec.get("tips", []),
-            explanation=spec.get("explanation", "")
-        )
-        
+                    spec = payload
+        TRACES.record("spec", spec)
+        yield _sse("spec", spec)
+
+        if not spec["devices"]:
+            TRACES.finish(request_id, status="error", error=NO_DEVICES_DETAIL)
+            yield _sse("error", {"status": 400, "detail": NO_DEVICES_DETAIL})
+            return
+
+        if await http_request.is_disconnected():
+            client_disconnects += 1
+            TRACES.finish(request_id, status="cancelled")
+            return
+        rendered = await _render_rack(spec, request.macro_count)
+        yield _sse("devices", {"chains": rendered.chains})
+        yield _sse("macros", {"macro_count": rendered.macro_count, "macro_details": rendered.macro_details})
+
+        if await http_request.is_disconnected():
+            client_disconnects += 1
+            TRACES.finish(request_id, status="cancelled")
+            return
+        filename = await _store_rack(rendered)
+        TRACES.finish(request_id, status="ok", filename=filename)
+        info = _rack_info(rendered, spec, filename, rendered.data if request.inline else None)
+        yield _sse("ready", {**jsonable_encoder(info), "download_url": f"/download/{filename}"})
+    except (asyncio.CancelledError, GeneratorExit):
+        if "status" not in (TRACES.get(request_id) or {}):  # Already finished if the client left during the last event
+            TRACES.finish(request_id, status="cancelled")
+        raise
     except Exception as e:
         import traceback
         print(traceback.format_exc())
+        TRACES.finish(request_id, status="error", error=str(e))
+        yield _sse("error", {"status": 500, "detail": str(e)})
+
+
+@app.post("/generate/batch")
+async def generate_rack_batch(request: BatchGenerateRequest):
+    """
+    Generate one rack per prompt, streamed as NDJSON in completion order:
+    {"index", "status": "ok", "rack"} | {"index", "status": "error", "status_code", "detail"}, then {"summary"}
+    """
+    if not request.prompts:
+        raise HTTPException(status_code=422, detail="prompts must not be empty")
+    if len(request.prompts) > BATCH_MAX_PROMPTS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_PROMPTS} prompts per batch")
+    return StreamingResponse(
+        _batch_lines(request),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _batch_lines(request: BatchGenerateRequest):
+    parse_slots = asyncio.Semaphore(BATCH_PARSE_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(_batch_item(index, prompt, request, parse_slots))
+        for index, prompt in enumerate(request.prompts)
+    ]
+    ok = failed = 0
+    started = time.time()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            if item["status"] == "ok":
+                ok += 1
+            else:
+                failed += 1
+            yield json.dumps(jsonable_encoder(item)) + "\n"
+        yield json.dumps({"summary": {"ok": ok, "failed": failed, "elapsed_s": round(time.time() - started, 2)}}) + "\n"
+    finally:
+        # Client went away mid-batch: stop the remaining parses and builds
+        for task in tasks:
+            task.cancel()
+
+
+async def _batch_item(index: int, prompt: str, request: BatchGenerateRequest, parse_slots: asyncio.Semaphore) -> dict:
+    """Parse (bounded per batch) + build (worker pool) + save for one prompt; errors become result lines"""
+    TRACES.begin(prompt, endpoint="/generate/batch", batch_index=index)
+    try:
+        async with parse_slots:
+            spec = await nlp_parser.parse(prompt, deadline_s=request.deadline_s, macro_count=request.macro_count)
+        TRACES.record("spec", spec)
+        if not spec["devices"]:
+            TRACES.finish(status="error", error=NO_DEVICES_DETAIL)
+            return {"index": index, "prompt": prompt, "status": "error", "status_code": 400, "detail": NO_DEVICES_DETAIL}
+
+        rendered = await _render_rack(spec, request.macro_count, batch_build_pool)
+        filename = await _store_rack(rendered)
+        TRACES.finish(status="ok", filename=filename)
+        info = _rack_info(rendered, spec, filename, rendered.data if request.inline else None)
+        return {"index": index, "prompt": prompt, "status": "ok", "rack": info}
+    except asyncio.CancelledError:
+        TRACES.finish(status="cancelled")
+        raise
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        TRACES.finish(status="error", error=str(e))
+        return {"index": index, "prompt": prompt, "status": "error", "status_code": 500, "detail": str(e)}
+
+
+@app.post("/build", response_model=RackInfo)
+async def build_rack_from_spec(request: BuildRequest):
+    """
+    Build .adg file from a parsed spec (replay, client-cached specs, builder load tests)
+    """
+    try:
+        spec = validate_spec(request.spec, request.macro_count)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    TRACES.begin(spec.get("creative_name", ""), endpoint="/build", spec=spec)
+    try:
+        rendered = await _render_rack(spec, request.macro_count)
+        filename = await _store_rack(rendered)
+        TRACES.finish(status="ok", filename=filename)
+        return _rack_info(rendered, spec, filename, rendered.data if request.inline else None)
+    except asyncio.CancelledError:
+        TRACES.finish(status="cancelled")
+        raise
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        TRACES.finish(status="error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/download/{filename}")
-async def download_rack(filename: str):
-    """Download a generated rack file"""
-    gen_dir = os.path.join(os.path.dirname(__file__), "generated")
-    filepath = os.path.join(gen_dir, filename)
-    
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail="File not found")
-        
-    return FileResponse(
-        filepath,
+async def download_rack(filename: str, request: Request):
+    """Download a generated rack file (ETag + single byte-range support)"""
+    # V66: /generate is almost always followed by /download, serve that one from memory
+    data = rack_store.hot_bytes(filename)
+    filepath = None
+    if data is None:
+        filepath = rack_store.resolve(filename)
+        if filepath is None:
+            raise HTTPException(status_code=404, detail="File not found")
+
+    etag = rack_store.etag(filename, filepath)
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=86400, immutable"}
+    validators = [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+    if etag in validators or "*" in validators:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if data is None and not range_header:
+        # Full body: FileResponse streams it from disk
+        return FileResponse(
+            filepath,
+            media_type="application/octet-stream",
+            filename=filename,
+            headers=headers
+        )
+    # Ranges are answered here for both tiers: FileResponse only supports Range on recent Starlette
+    headers = {**headers, "Content-Disposition": f'attachment; filename="{filename}"'}
+    size = len(data) if data is not None else os.path.getsize(filepath)
+    byte_range = _parse_range(range_header, size)
+    if byte_range is None:
+        body = data if data is not None else await asyncio.to_thread(_read_file_range, filepath, 0, size - 1)
+        return Response(content=body, media_type="application/octet-stream", headers=headers)
+    if byte_range == "invalid":
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    start, end = byte_range
+    return Response(
+        content=data[start:end + 1] if data is not None else await asyncio.to_thread(_read_file_range, filepath, start, end),
+        status_code=206,
         media_type="application/octet-stream",
-        filename=filename
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"}
     )
 
 
+def _parse_range(range_header: Optional[str], size: int):
+    """(start, end) for a single 'bytes=start-end' range, None to send everything, "invalid" for 416.
+
+    Multi-range and non-bytes units are ignored (full 200 body), as RFC 9110 allows.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start_s, _, end_s = range_header[6:].strip().partition("-")
+    try:
+        if start_s:
+            start, end = int(start_s), int(end_s) if end_s else size - 1
+        else:
+            start, end = max(0, size - int(end_s)), size - 1  # Suffix range: last N bytes
+    except ValueError:
+        return "invalid"
+    if start < 0 or start >= size or end < start:
+        return "invalid"
+    return start, min(end, size - 1)
+
+
+def _read_file_range(path: str, start: int, end: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start + 1)
+
+
+@app.get("/debug/traces")
+async def list_traces(limit: int = 20):
+    """Most recent generation traces (TRACE_ENDPOINT=1 only: they contain user prompts)"""
+    if not TRACE_ENDPOINT_ENABLED:
+        raise HTTPException(status_code=404, detail="Not found")
+    return TRACES.recent(limit)
+
+
+@app.get("/debug/traces/{request_id}")
+async def get_trace(request_id: str):
+    """Full trace of one request: prompt, raw model output, model JSON, resolved spec"""
+    if not TRACE_ENDPOINT_ENABLED:
+        raise HTTPException(status_code=404, detail="Not found")
+    trace = TRACES.get(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (evicted or unknown id)")
+    return trace
+
+
 @app.get("/health")
 async def health():
     """Detailed health check"""
     return {
         "status": "healthy",
         "devices_loaded": device_db.device_count(),
-        "nlp_ready": nlp_parser.is_ready()
+        "nlp_ready": nlp_parser.is_ready(),
+        "fragment_cache": DEVICE_FRAGMENT_CACHE.stats(),
+        "parse_cache": nlp_parser.parse_cache.stats() if nlp_parser.parse_cache else None,
+        "context_cache": nlp_parser.context_cache.stats() if nlp_parser.context_cache else None,
+        "generate_flight": generate_flight.stats(),
+        "llm_circuit": {model: breaker.stats() for model, breaker in nlp_parser.circuit_breakers.items()},
+        "parse_deadline_misses": nlp_parser.deadline_misses,
+        "client_disconnects": client_disconnects,
+        "model_routing": nlp_parser.model_router.stats() if nlp_parser.model_router else None,
+        "traces": TRACES.stats(),
+        "rack_store": rack_store.stats(),
+        "build_pool": build_pool.stats(),
+        "batch_build_pool": batch_build_pool.stats() if batch_build_pool is not build_pool else None
     }
 
 
@@ -0,0 +1,14 @@
+"""
+Shared pytest setup: tests import backend modules as the app does (core.*, main)
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Never talk to Gemini or write parse results from the test suite
+os.environ.pop("GOOGLE_API_KEY", None)
+os.environ.setdefault("PARSE_CACHE", "0")
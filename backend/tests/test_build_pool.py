@@ -0,0 +1,77 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from core.build_pool import PROCESS_START_METHOD, BuildPool
+
+
+def boom():
+    raise ValueError("bad spec")
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError, match="Unknown build pool"):
+        BuildPool("fiber")
+
+
+def test_thread_pool_runs_jobs_and_counts_them():
+    pool = BuildPool("thread", workers=2)
+    assert pool.stats()["started"] is False  # Lazy
+
+    async def run():
+        ok = await asyncio.gather(*[pool.run(pow, 2, i) for i in range(5)])
+        with pytest.raises(ValueError, match="bad spec"):
+            await pool.run(boom)
+        return ok
+
+    assert asyncio.run(run()) == [1, 2, 4, 8, 16]
+    stats = pool.stats()
+    assert (stats["submitted"], stats["completed"], stats["failed"], stats["pending"]) == (6, 5, 1, 0)
+    assert stats["started"] is True and stats["avg_ms"] is not None
+    pool.shutdown()
+
+
+def test_queue_depth_and_cancelled_queued_jobs():
+    pool = BuildPool("thread", workers=1)
+    release = threading.Event()
+
+    async def run():
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = [asyncio.ensure_future(pool.run(pow, 2, i)) for i in range(3)]
+        await asyncio.sleep(0.05)
+        busy = pool.stats()
+        queued[0].cancel()  # Not started yet: dropped from the executor queue
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(running, *queued[1:])
+        return busy, results
+
+    busy, results = asyncio.run(run())
+    assert (busy["pending"], busy["running"], busy["queue_depth"]) == (4, 1, 3)
+    assert results == [True, 2, 4]
+    stats = pool.stats()
+    assert stats["max_queue_depth"] == 3 and stats["queue_depth"] == 0
+    assert (stats["completed"], stats["cancelled"]) == (3, 1)
+    pool.shutdown()
+
+
+def test_shutdown_stops_the_executor_and_restarts_lazily():
+    pool = BuildPool("thread", workers=1)
+    assert asyncio.run(pool.run(pow, 3, 2)) == 9
+    pool.shutdown()
+    assert pool.stats()["started"] is False
+    pool.shutdown()  # Idempotent
+    assert asyncio.run(pool.run(pow, 2, 3)) == 8
+    pool.shutdown()
+
+
+def test_process_pool_uses_spawned_workers():
+    pool = BuildPool("process", workers=1)
+    try:
+        assert asyncio.run(pool.run(os.getpid)) != os.getpid()
+        assert pool._executor._mp_context.get_start_method() == PROCESS_START_METHOD == "spawn"
+        assert pool.stats()["completed"] == 1
+    finally:
+        pool.shutdown()
@@ -0,0 +1,17 @@
+from core.builder import rack
+from core.device_mapper import normalize_device_name
+
+
+def test_semantic_lookup_memoizes_hits_only_and_stays_bounded(monkeypatch):
+    monkeypatch.setattr(rack, "_SEMANTIC_LOOKUP_CACHE", {})
+    monkeypatch.setattr(rack, "SEMANTIC_CACHE_MAX", 4)
+
+    hit = rack._semantic_intents_for(normalize_device_name("My Chorus (2)"))
+    assert hit and hit == rack._SEMANTIC_INDEX["chorus2"]
+    assert rack._semantic_intents_for("notadevice") == ()
+    assert "notadevice" not in rack._SEMANTIC_LOOKUP_CACHE
+
+    for i in range(10):
+        rack._semantic_intents_for(f"chorus{i}copy")
+    assert len(rack._SEMANTIC_LOOKUP_CACHE) == 4
+    assert "chorus9copy" in rack._SEMANTIC_LOOKUP_CACHE
@@ -0,0 +1,79 @@
+import pytest
+
+from core import circuit_breaker
+from core.circuit_breaker import LatencyCircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def tripped(clock, slo=1.0, cooldown=60.0) -> LatencyCircuitBreaker:
+    breaker = LatencyCircuitBreaker(slo_seconds=slo, window=5, min_samples=3, cooldown_seconds=cooldown)
+    for _ in range(3):
+        breaker.record(slo * 3, ticket=breaker.allow())
+    assert breaker.state == breaker.OPEN
+    return breaker
+
+
+def test_stays_closed_while_median_under_slo(clock):
+    breaker = LatencyCircuitBreaker(slo_seconds=1.0, window=5, min_samples=3)
+    for latency in (0.2, 5.0, 0.3, 0.4):  # One slow outlier does not move the median
+        breaker.record(latency, ticket=breaker.allow())
+    assert breaker.state == breaker.CLOSED
+    assert breaker.stats()["trips"] == 0
+
+
+def test_failures_count_as_twice_the_slo(clock):
+    breaker = LatencyCircuitBreaker(slo_seconds=1.0, window=5, min_samples=3)
+    for _ in range(3):
+        breaker.record(0.01, ok=False, ticket=breaker.allow())
+    assert breaker.state == breaker.OPEN
+
+
+def test_open_circuit_short_circuits_until_cooldown(clock):
+    breaker = tripped(clock)
+    assert breaker.allow() is None
+    assert breaker.stats()["short_circuits"] == 1
+    clock[0] += 59
+    assert breaker.allow() is None
+    clock[0] += 1
+    assert breaker.allow() is not None
+    assert breaker.state == breaker.HALF_OPEN
+
+
+def test_half_open_lets_exactly_one_probe_through(clock):
+    breaker = tripped(clock, cooldown=0)
+    probe = breaker.allow()
+    assert probe is not None
+    assert breaker.allow() is None
+
+
+def test_fast_probe_closes_slow_probe_reopens(clock):
+    breaker = tripped(clock, cooldown=0)
+    breaker.record(0.5, ticket=breaker.allow())
+    assert breaker.state == breaker.CLOSED
+
+    breaker = tripped(clock, cooldown=0)
+    breaker.record(5.0, ticket=breaker.allow())
+    assert breaker.state == breaker.OPEN
+    assert breaker.stats()["trips"] == 2
+
+
+def test_only_probe_owner_can_release_or_settle_it(clock):
+    breaker = tripped(clock, cooldown=0)
+    straggler = 10 ** 6  # Ticket of a request admitted before the trip
+    probe = breaker.allow()
+
+    breaker.release_probe(straggler)
+    breaker.release_probe(None)
+    assert breaker.allow() is None  # Probe still owned
+
+    breaker.record(0.1, ticket=straggler)
+    assert breaker.state == breaker.HALF_OPEN  # A foreign answer does not close the circuit
+
+    breaker.release_probe(probe)
+    assert breaker.allow() is not None  # Next caller becomes the probe
@@ -0,0 +1,83 @@
+import base64
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from core.rack_store import RackStore
+
+DATA = bytes(range(256)) * 4  # 1024 bytes, every offset distinguishable
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(params=["hot", "disk"])
+def rack(request, tmp_path, monkeypatch):
+    """A stored rack served from memory (hot) or from the file (disk fallback)"""
+    store = RackStore(str(tmp_path), hot_max_bytes=10 ** 6 if request.param == "hot" else 0)
+    monkeypatch.setattr(main, "rack_store", store)
+    return store.put(DATA, "Test_Rack")
+
+
+def test_full_download_with_strong_etag(client, rack):
+    res = client.get(f"/download/{rack}")
+    assert res.status_code == 200
+    assert res.content == DATA
+    assert res.headers["etag"] == RackStore.etag(rack)
+    assert res.headers["accept-ranges"] == "bytes"
+    assert rack in res.headers["content-disposition"]
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", '"other", {etag}', "*"])
+def test_matching_etag_is_not_modified(client, rack, if_none_match):
+    etag = RackStore.etag(rack)
+    res = client.get(f"/download/{rack}", headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert res.status_code == 304
+    assert res.content == b""
+
+
+@pytest.mark.parametrize("header,start,end", [
+    ("bytes=0-9", 0, 9),
+    ("bytes=-5", 1019, 1023),
+    ("bytes=1000-", 1000, 1023),
+    ("bytes=1000-99999", 1000, 1023),
+    ("bytes=512-512", 512, 512),
+])
+def test_single_range_is_partial_content(client, rack, header, start, end):
+    res = client.get(f"/download/{rack}", headers={"Range": header})
+    assert res.status_code == 206
+    assert res.headers["content-range"] == f"bytes {start}-{end}/1024"
+    assert res.content == DATA[start:end + 1]
+
+
+@pytest.mark.parametrize("header", ["bytes=5-3", "bytes=1024-", "bytes=x-1", "bytes=-0"])
+def test_unsatisfiable_range(client, rack, header):
+    res = client.get(f"/download/{rack}", headers={"Range": header})
+    assert res.status_code == 416
+    assert res.headers["content-range"] == "bytes */1024"
+
+
+@pytest.mark.parametrize("header", ["bytes=0-1,4-5", "items=0-1"])
+def test_unsupported_range_forms_get_the_full_body(client, rack, header):
+    res = client.get(f"/download/{rack}", headers={"Range": header})
+    assert res.status_code == 200
+    assert res.content == DATA
+
+
+@pytest.mark.parametrize("name", ["missing_0123456789abcdef.adg", "main.py", "..%2Fmain.py"])
+def test_unknown_or_unsafe_names_are_404(client, rack, name):
+    assert client.get(f"/download/{name}").status_code == 404
+
+
+def test_inline_generate_matches_download(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "rack_store", RackStore(str(tmp_path)))
+    info = client.post("/generate", json={"prompt": "rack with compressor and eq eight", "inline": True}).json()
+    assert info["adg_base64"]
+    assert base64.b64decode(info["adg_base64"]) == client.get(f"/download/{info['filename']}").content
+
+    plain = client.post("/generate", json={"prompt": "rack with saturator"}).json()
+    assert plain["adg_base64"] is None
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from core.trace_ring import TRACES
+
+
+class _Request:
+    async def is_disconnected(self):
+        return False
+
+
+def _fake_parse_stream(spec):
+    async def parse_stream(prompt, deadline_s=None, macro_count=None):
+        yield "device", "Compressor"
+        yield "spec", spec
+    return parse_stream
+
+
+@pytest.fixture
+def parse_to(monkeypatch):
+    def use(spec):
+        monkeypatch.setattr(main.nlp_parser, "parse_stream", _fake_parse_stream(spec))
+    return use
+
+
+def _last_trace():
+    return TRACES.get(TRACES.recent(1)[0]["request_id"])
+
+
+def test_no_devices_closes_the_trace_as_error(parse_to):
+    parse_to({"devices": []})
+    res = TestClient(main.app).post("/generate/stream", json={"prompt": "nothing"})
+    assert "event: error" in res.text and main.NO_DEVICES_DETAIL in res.text
+    trace = _last_trace()
+    assert trace["status"] == "error" and trace["error"] == main.NO_DEVICES_DETAIL
+
+
+def test_disconnect_mid_stream_closes_the_trace_as_cancelled(parse_to):
+    parse_to({"devices": ["Compressor"]})
+
+    async def run():
+        events = main._generate_events(main.GenerateRequest(prompt="bus"), _Request())
+        assert (await events.__anext__()).startswith("event: device")
+        await events.aclose()  # What the server does when the client goes away
+
+    asyncio.run(run())
+    assert _last_trace()["status"] == "cancelled"
+
+
+def test_disconnect_after_ready_keeps_ok(parse_to, monkeypatch):
+    parse_to({"devices": ["Compressor"]})
+
+    async def store(rendered):
+        return "Rack_0123456789abcdef.adg"
+    monkeypatch.setattr(main, "_store_rack", store)
+
+    async def run():
+        events = main._generate_events(main.GenerateRequest(prompt="bus"), _Request())
+        async for chunk in events:
+            if chunk.startswith("event: ready"):
+                await events.aclose()
+                break
+
+    asyncio.run(run())
+    assert _last_trace()["status"] == "ok"
@@ -0,0 +1,88 @@
+import contextlib
+import io
+
+import pytest
+
+from core.manual_index import CHUNK_CHARS, ManualIndex, tokenize
+
+MANUAL = "\n".join([
+    "Preface line before any heading.",
+    "--- PAGE 12 ---",
+    "24.7 Using the Macro Controls",
+    "Macro controls map rack parameters to eight knobs.",
+    "•",
+    "28.2 1 Glue Compressor",
+    "The Glue Compressor is an analog-modeled bus compressor for glue.",
+    "28.37 . 1 Sidechain Section",
+    "Sidechain ducking lets a kick drum duck the bass.",
+    "143",
+    "28.9 Chorus-Ensemble",
+    "Chorus-Ensemble thickens a sound with modulated delay lines.",
+])
+
+
+def long_section(title, sentences):
+    return "\n".join([f"30.1 {title}"] + [f"Sentence {i} about reverb tails and decay time." for i in range(sentences)])
+
+
+def test_sections_split_at_second_level_headings_only():
+    index = ManualIndex(MANUAL)
+    assert list(index.sections) == ["Introduction", "Using the Macro Controls", "Glue Compressor", "Chorus-Ensemble"]
+    glue = index.section_text("Glue Compressor")
+    assert glue.startswith("28.2 1 Glue Compressor")
+    assert "Sidechain Section" in glue and "duck the bass" in glue  # Deeper heading stays in its parent
+    assert "143" not in glue and "PAGE" not in index.section_text("Introduction")  # Noise lines dropped
+    assert index.section_text("Missing") == ""
+
+
+def test_long_sections_are_split_into_passages_at_line_starts():
+    index = ManualIndex(long_section("Reverb", 200))
+    chunks = index.sections["Reverb"]
+    assert len(chunks) > 1
+    assert all(c.text.split("\n")[0][:1].isupper() or c.text[:1].isdigit() for c in chunks)
+    assert all(len(c.text) < CHUNK_CHARS + 100 for c in chunks)
+    assert "\n".join(c.text for c in chunks) == index.section_text("Reverb")
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("The Glue-Compressor is for the BUS!") == ["glue", "compressor", "bus"]
+
+
+def test_bm25_ranks_the_matching_section_first():
+    index = ManualIndex(MANUAL)
+    scores = index.score("sidechain ducking")
+    best = max(scores, key=scores.get)
+    assert index.chunks[best].section == "Glue Compressor"
+    assert index.score("zebra") == {}
+
+
+@pytest.mark.parametrize("budget", [200, 1000, 5000])
+def test_retrieve_stays_within_the_character_budget(budget):
+    text = "\n".join([MANUAL, long_section("Reverb", 300), long_section("Delay", 300).replace("30.1", "30.2")])
+    index = ManualIndex(text)
+    excerpts = index.retrieve("reverb decay time glue", ["Reverb", "Glue Compressor"], budget)
+    body = "\n".join(line for line in excerpts.split("\n") if not line.startswith("### "))
+    assert len(body) <= budget + excerpts.count("\n")
+
+
+def test_retrieve_puts_named_sections_first_and_renders_in_manual_order():
+    index = ManualIndex(MANUAL)
+    excerpts = index.retrieve("thick modulated sound", ["Chorus-Ensemble", "Unknown Title"], 12000)
+    assert "### Chorus-Ensemble" in excerpts
+    headers = [line for line in excerpts.split("\n") if line.startswith("### ")]
+    order = list(index.sections)
+    assert headers == sorted(headers, key=lambda h: order.index(h[4:]))
+    assert index.retrieve("zebra", [], 12000) == ""
+
+
+def test_prompt_devices_without_their_own_title_still_get_a_section():
+    from core.nlp_parser import RackNLPParser
+    from core.rack_factory import default_device_db
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = RackNLPParser(default_device_db())
+    if parser.manual_index is None:
+        pytest.skip("MANUAL_EXTRACT.txt not available")
+    assert parser.device_sections.get("Chorus") == "Chorus-Ensemble"
+    assert parser.device_sections.get("Chorus-Ensemble") == "Chorus-Ensemble"
+    assert "### Chorus-Ensemble" in parser._manual_context("lush chorus on the pads")
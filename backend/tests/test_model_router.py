@@ -0,0 +1,57 @@
+import pytest
+
+from core.model_router import ModelRouter
+
+
+@pytest.fixture
+def router():
+    return ModelRouter("flash", "pro", threshold=4.0)
+
+
+@pytest.mark.parametrize("text,devices,macros,expected", [
+    ("compressor and eq", 2, None, 2 + 3 / 20),
+    ("compressor and eq", 2, 16, 2 + 4 + 3 / 20),
+    ("compressor and eq", 2, 4, 2 + 3 / 20),  # Fewer macros never lowers the score
+    ("word " * 100, 0, None, 3.0),  # Length term capped at 3
+    ("sidechain", 0, None, 1.5 + 1 / 20),
+    ("sidechain ducking sidechain", 0, None, 3.0 + 3 / 20),  # Distinct intents only
+    ("parallel multiband glitchy mastering", 0, None, 3.0 + 4 / 20),  # Intent term capped at 3
+    ("Cinematic RISER", 0, None, 3.0 + 2 / 20),  # Case-insensitive
+    ("masterpiece", 0, None, 1 / 20),  # Whole words only
+])
+def test_score_terms_and_caps(router, text, devices, macros, expected):
+    assert router.score(text, devices, macros) == round(expected, 2)
+
+
+@pytest.mark.parametrize("devices,expected_model", [
+    (3, "flash"),  # 3.05 (just below the threshold)
+    (4, "pro"),  # 4.05
+])
+def test_route_at_the_threshold(router, devices, expected_model):
+    model, complexity = router.route("one", devices)
+    assert model == expected_model
+    assert complexity == devices + 0.05
+
+
+def test_score_equal_to_threshold_goes_pro():
+    router = ModelRouter("flash", "pro", threshold=4.05)
+    assert router.route("one", 4) == ("pro", 4.05)
+    assert router.route("one", 3) == ("flash", 3.05)
+
+
+def test_extra_macros_alone_can_tip_a_prompt_to_pro(router):
+    assert router.route("bus glue", 2)[0] == "flash"
+    assert router.route("bus glue", 2, macro_count=12)[0] == "pro"
+
+
+def test_only_recorded_calls_are_counted(router):
+    router.route("compressor", 1)
+    router.route("parallel mastering chain " * 10, 5)
+    assert router.stats()["routed"] == {"fast": 0, "pro": 0}
+
+    router.record_call("flash")
+    router.record_call("pro")
+    router.record_call("pro")
+    router.record_call("some-other-model")
+    assert router.stats() == {"fast_model": "flash", "pro_model": "pro", "threshold": 4.0,
+                              "routed": {"fast": 1, "pro": 2}}
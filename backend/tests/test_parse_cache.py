@@ -0,0 +1,119 @@
+import asyncio
+import os
+
+import pytest
+
+from core import parse_cache
+from core.parse_cache import ParseCache, normalize_prompt
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(parse_cache.time, "time", clock)
+    return clock
+
+
+def key(i):
+    return ParseCache.make_key(f"prompt {i}", "flash", "v1")
+
+
+def disk_files(root):
+    return [os.path.join(d, f) for d, _, files in os.walk(root) for f in files]
+
+
+def test_keys_ignore_case_whitespace_and_trailing_punctuation():
+    assert normalize_prompt("  Warm  and FAT!") == "warm and fat"
+    assert ParseCache.make_key("Warm and FAT!", "flash", "v1") == ParseCache.make_key("warm   and fat", "flash", "v1")
+    assert ParseCache.make_key("warm", "flash", "v1") != ParseCache.make_key("warm", "pro", "v1")
+    assert ParseCache.make_key("warm", "flash", "v1") != ParseCache.make_key("warm", "flash", "v2")
+
+
+def test_get_returns_private_copies(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    cache.put(key(1), {"devices": ["Compressor"]})
+    cache.get(key(1))["devices"].append("Mutated")
+    assert cache.get(key(1)) == {"devices": ["Compressor"]}
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    ParseCache(str(tmp_path)).put(key(1), {"devices": ["EQ Eight"]})
+    fresh = ParseCache(str(tmp_path))
+    assert fresh.get(key(1)) == {"devices": ["EQ Eight"]}
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_entries_expire_in_both_tiers(tmp_path, clock):
+    cache = ParseCache(str(tmp_path), ttl_seconds=60)
+    cache.put(key(1), {"devices": ["Reverb"]})
+    clock.now += 59
+    assert cache.get(key(1)) is not None
+    clock.now += 2
+    assert cache.get(key(1)) is None
+    assert disk_files(tmp_path) == []  # Expired file removed on read
+    assert cache.stats()["misses"] == 1
+
+
+def test_memory_tier_is_lru_bounded(tmp_path):
+    cache = ParseCache(str(tmp_path), max_entries=2)
+    for i in range(3):
+        cache.put(key(i), {"i": i})
+    cache.get(key(1))
+    cache.put(key(3), {"i": 3})
+    assert list(cache._memory) == [key(1), key(3)]
+    assert cache.get(key(0)) == {"i": 0}  # Still on disk
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_full_disk_is_trimmed_to_the_low_water_mark_by_access_time(tmp_path, clock):
+    cache = ParseCache(str(tmp_path), max_entries=1, max_disk_entries=10, ttl_seconds=0)
+    for i in range(10):
+        cache.put(key(i), {"i": i})
+    paths = {i: cache._path(key(i)) for i in range(10)}
+    for i, path in paths.items():
+        os.utime(path, (1000 + i, 1000 + i))
+    os.utime(paths[0], (5000, 5000))  # Recently read: survives the trim
+    assert len(disk_files(tmp_path)) == 10
+
+    cache.put(key(10), {"i": 10})  # 11 > 10: trim down to 9
+    remaining = set(disk_files(tmp_path))
+    assert len(remaining) == 9 and cache.stats()["disk_entries"] == 9
+    assert paths[0] in remaining
+    assert paths[1] not in remaining and paths[2] not in remaining
+
+    cache.put(key(11), {"i": 11})  # Headroom: no scan, no trim
+    assert len(disk_files(tmp_path)) == 10
+
+
+def test_trim_drops_expired_entries_first(tmp_path, clock):
+    cache = ParseCache(str(tmp_path), max_entries=1, max_disk_entries=4, ttl_seconds=60)
+    for i in range(4):
+        cache.put(key(i), {"i": i})
+    stale = cache._path(key(3))
+    os.utime(stale, (clock.now - 120, clock.now - 120))
+    for i in range(3):
+        os.utime(cache._path(key(i)), (clock.now, clock.now))
+    cache.put(key(4), {"i": 4})
+    assert not os.path.exists(stale)
+    assert len(disk_files(tmp_path)) == 3  # int(4 * 0.9)
+
+
+def test_async_helpers_and_clear(tmp_path):
+    cache = ParseCache(str(tmp_path))
+
+    async def run():
+        await cache.aput(key(1), {"devices": ["Saturator"]})
+        return await cache.aget(key(1)), await cache.aget(key(2))
+
+    assert asyncio.run(run()) == ({"devices": ["Saturator"]}, None)
+    cache.clear()
+    assert cache.get(key(1)) is None
+    assert disk_files(tmp_path) == [] and cache.stats()["disk_entries"] == 0
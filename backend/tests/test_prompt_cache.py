@@ -0,0 +1,178 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core import prompt_cache
+from core.prompt_cache import (EXPIRY_MARGIN_S, FAILURE_BACKOFF_S, ContextCacheProvider,
+                               LocalContextCache)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(prompt_cache.time, "monotonic", clock)
+    return clock
+
+
+class FlakyCache(LocalContextCache):
+    def __init__(self, fail_times):
+        super().__init__(ttl_seconds=600)
+        self.fail_times = fail_times
+        self.calls = 0
+
+    async def _create(self, model_id, system_prompt, prefix_hash):
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise RuntimeError("400 Cached content is too small")
+        return await super()._create(model_id, system_prompt, prefix_hash)
+
+
+def handle(cache, model="flash", prompt="SYSTEM"):
+    return asyncio.run(cache.get_handle(model, prompt))
+
+
+def test_provider_must_implement_create():
+    with pytest.raises(TypeError):
+        ContextCacheProvider()
+
+
+def test_handle_is_reused_per_model_and_prefix(clock):
+    cache = LocalContextCache()
+    first = handle(cache)
+    assert first == handle(cache)
+    assert cache.contexts[first] == "SYSTEM"
+    assert handle(cache, model="pro") != first
+    assert handle(cache, prompt="OTHER") != first
+    assert cache.stats()["created"] == 3
+
+
+def test_concurrent_requests_create_once(clock):
+    cache = LocalContextCache()
+
+    async def burst():
+        return await asyncio.gather(*[cache.get_handle("flash", "SYSTEM") for _ in range(10)])
+
+    assert len(set(asyncio.run(burst()))) == 1
+    assert cache.created == 1
+
+
+def test_handle_is_refreshed_before_the_provider_expires_it(clock):
+    cache = LocalContextCache(ttl_seconds=600)
+    handle(cache)
+    clock.now += 600 - EXPIRY_MARGIN_S - 1
+    handle(cache)
+    assert cache.created == 1
+    clock.now += 2
+    handle(cache)
+    assert cache.created == 2
+
+
+def test_failed_create_backs_off_and_doubles(clock):
+    cache = FlakyCache(fail_times=2)
+    assert handle(cache) is None
+    assert handle(cache) is None  # In backoff: no second provider call
+    assert (cache.calls, cache.stats()["skipped"], cache.stats()["backing_off"]) == (1, 1, 1)
+
+    clock.now += FAILURE_BACKOFF_S
+    assert handle(cache) is None  # Retried, failed again: backoff doubles
+    clock.now += FAILURE_BACKOFF_S
+    assert handle(cache) is None and cache.calls == 2
+    clock.now += FAILURE_BACKOFF_S
+    assert handle(cache) is not None
+    assert (cache.calls, cache.failures, cache.stats()["backing_off"]) == (3, 2, 0)
+
+
+def test_invalidate_drops_handles_and_backoff(clock):
+    cache = FlakyCache(fail_times=1)
+    assert handle(cache, prompt="A") is None
+    cache.invalidate()
+    first = handle(cache, prompt="A")
+    assert first is not None and cache.calls == 2
+    cache.invalidate()
+    assert handle(cache, prompt="A") == first  # Same prefix, recreated
+    assert cache.calls == 3 and cache.stats()["handles"] == 1
+
+
+@pytest.mark.parametrize("message,stale", [
+    ("404 NOT_FOUND. {'message': 'CachedContent not found (or permission denied)'}", True),
+    ("400 Cache content 123 is expired.", True),
+    ("429 RESOURCE_EXHAUSTED", False),
+])
+def test_stale_handle_errors_are_recognised(message, stale):
+    assert ContextCacheProvider.is_stale_handle_error(RuntimeError(message)) is stale
+
+
+class FakeModels:
+    """Gemini stand-in that only accepts handles the local cache still holds"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = []
+
+    def _check(self, config):
+        self.calls.append(config.cached_content)
+        if config.cached_content and config.cached_content not in self.cache.contexts:
+            raise RuntimeError("403 PERMISSION_DENIED. CachedContent not found (or permission denied)")
+
+    async def generate_content(self, model, contents, config):
+        self._check(config)
+        return SimpleNamespace(text='{"creative_name": "Glue", "devices": ["Compressor"]}')
+
+    async def generate_content_stream(self, model, contents, config):
+        self._check(config)
+
+        async def chunks():
+            for part in ('{"creative_name": "Glue", ', '"devices": ["Compressor"]}'):
+                yield SimpleNamespace(text=part)
+        return chunks()
+
+
+@pytest.fixture
+def parser():
+    from core.nlp_parser import RackNLPParser
+    from core.rack_factory import default_device_db
+
+    cache = LocalContextCache()
+    parser = RackNLPParser(default_device_db(), context_cache=cache)
+    parser.ai_enabled = True
+    parser.model_id = "pro"
+    parser.client = SimpleNamespace(aio=SimpleNamespace(models=FakeModels(cache)))
+    return parser
+
+
+def _expire_provider_side(cache):
+    cache.contexts.clear()  # Deleted or expired early on the provider, local TTL still running
+
+
+def test_parse_recreates_a_context_the_provider_dropped(parser):
+    cache, models = parser.context_cache, parser.client.aio.models
+    asyncio.run(parser._parse_with_ai("glue compressor"))
+    stale = models.calls[-1]
+    _expire_provider_side(cache)
+
+    spec = asyncio.run(parser._parse_with_ai("glue compressor"))
+    assert spec["ai_powered"] and spec["devices"] == ["Compressor"]
+    assert models.calls[-2] == stale and models.calls[-1] in cache.contexts
+    assert cache.created == 2
+
+
+def test_stream_recreates_a_context_the_provider_dropped(parser):
+    cache, models = parser.context_cache, parser.client.aio.models
+    asyncio.run(parser._parse_with_ai("glue compressor"))
+    _expire_provider_side(cache)
+
+    async def collect():
+        return [event async for event in parser.parse_stream("glue compressor")]
+
+    events = asyncio.run(collect())
+    assert events[-1][0] == "spec" and events[-1][1]["ai_powered"]
+    assert models.calls[-1] in cache.contexts and cache.created == 2
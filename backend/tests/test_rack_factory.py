@@ -0,0 +1,93 @@
+import gzip
+
+import pytest
+
+from core.rack_factory import MAX_CHAINS, build_adg, render_rack, validate_spec
+
+VALID = {
+    "creative_name": "Night Bus",
+    "devices": ["EQ Eight", {"name": "Compressor"}],
+    "chains": 2,
+    "macro_count": 8,
+    "macro_details": [
+        {"macro": 1, "name": "Low Kill", "target_device": "EQ Eight", "target_parameter": "Bands.1.Gain", "min": 0, "max": -15},
+        {"name": "Squash", "target_device": "Compressor", "target_parameter": "Threshold"},
+        {"macro": 3, "target_device": None},  # Skipped by the builder, not an error
+    ],
+    "surgical_devices": [{"name": "EQ Eight", "parameters": {"Bands.2.Freq": 300, "Bands.3.On": False}}],
+}
+
+
+def spec(**overrides):
+    return {**VALID, **overrides}
+
+
+def test_valid_spec_passes_unchanged():
+    assert validate_spec(VALID) is VALID
+    validate_spec({"surgical_devices": [{"name": "Saturator"}]})  # Devices may come from any list
+
+
+@pytest.mark.parametrize("bad,reason", [
+    ([], "JSON object"),
+    (spec(devices="EQ Eight"), "spec.devices must be a list"),
+    (spec(devices=[{"name": 5}]), "spec.devices[0]"),
+    (spec(devices=[""]), "spec.devices[0]"),
+    ({"devices": []}, "no devices"),
+    (spec(macro_details=["x"]), "spec.macro_details[0] must be an object"),
+    (spec(macro_details=[{"macro": "x", "target_device": "EQ Eight", "target_parameter": "Gain"}]), ".macro must be"),
+    (spec(macro_details=[{"macro": 17, "target_device": "EQ Eight", "target_parameter": "Gain"}]), ".macro must be"),
+    (spec(macro_details=[{"macro": True, "target_device": "EQ Eight", "target_parameter": "Gain"}]), ".macro must be"),
+    (spec(macro_details=[{"target_device": "EQ Eight", "target_parameter": 3}]), "target_parameter must be a string"),
+    (spec(macro_details=[{"target_device": "EQ Eight", "target_parameter": "Gain", "min": "low"}]), ".min must be a number"),
+    (spec(macro_details=[{"target_device": "EQ Eight", "target_parameter": "Gain", "name": ["x"]}]), ".name must be a string"),
+    (spec(surgical_devices=[{"name": "EQ Eight", "parameters": [1]}]), ".parameters must be an object"),
+    (spec(surgical_devices=[{"name": "EQ Eight", "parameters": {"Gain": [1]}}]), "parameters.Gain"),
+    (spec(surgical_devices=[{"parameters": {}}]), "string name"),
+    (spec(macro_count="abc"), "spec.macro_count"),
+    (spec(macro_count=0), "spec.macro_count"),
+    (spec(creative_name=123), "creative_name"),
+    (spec(chains=100000), "spec.chains"),
+    (spec(chains=0), "spec.chains"),
+    (spec(chains="2"), "spec.chains"),
+    (spec(devices=[f"Device {i}" for i in range(65)]), "at most 64"),
+])
+def test_invalid_specs_are_rejected_with_a_reason(bad, reason):
+    with pytest.raises(ValueError) as err:
+        validate_spec(bad)
+    assert reason in str(err.value)
+
+
+@pytest.mark.parametrize("macro_count", [0, 17, "8"])
+def test_request_macro_count_is_range_checked(macro_count):
+    with pytest.raises(ValueError, match="macro_count"):
+        validate_spec(VALID, macro_count)
+
+
+def test_chain_cap_is_inclusive():
+    validate_spec(spec(chains=MAX_CHAINS))
+
+
+def test_build_adg_is_deterministic_gzip():
+    data = build_adg(VALID)
+    assert data == build_adg(VALID)
+    assert gzip.decompress(data).lstrip().startswith(b"<?xml")
+
+
+def test_render_rack_summary_matches_spec():
+    rendered = render_rack(VALID)
+    assert rendered.stem == "Night_Bus"
+    assert rendered.macro_count == 8
+    assert [c["name"] for c in rendered.chains] == ["Chain 1", "Chain 2"]
+    assert sum(len(c["devices"]) for c in rendered.chains) == 2
+    assert any(m["name"] == "Low Kill" for m in rendered.macro_details)
+
+
+def test_build_endpoint_returns_422_for_bad_specs():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    res = client.post("/build", json={"spec": spec(chains=100000)})
+    assert res.status_code == 422
+    assert "spec.chains" in res.json()["detail"]
+    assert client.post("/build", json={"spec": VALID, "macro_count": 40}).status_code == 422
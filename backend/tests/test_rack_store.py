@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+from core.rack_store import RackStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RackStore(str(tmp_path), max_bytes=1000, max_files=3, hot_max_bytes=250)
+
+
+def test_put_names_by_content_and_deduplicates(store, tmp_path):
+    first = store.put(b"a" * 100, "Dark_Bus")
+    again = store.put(b"a" * 100, "Dark_Bus")
+    other = store.put(b"b" * 100, "Dark_Bus")
+
+    assert first == again == RackStore.content_name(b"a" * 100, "Dark_Bus")
+    assert first.startswith("Dark_Bus_") and first.endswith(".adg")
+    assert other != first
+    assert store.stats()["deduplicated"] == 1
+    assert sorted(os.listdir(tmp_path)) == sorted([first, other])
+
+
+def test_evicts_least_recently_used_beyond_file_budget(store):
+    a = store.put(b"a" * 10, "A")
+    b = store.put(b"b" * 10, "B")
+    c = store.put(b"c" * 10, "C")
+    store.resolve(a)  # Touch: b is now the oldest
+    d = store.put(b"d" * 10, "D")
+
+    assert store.resolve(b) is None
+    assert all(store.resolve(name) for name in (a, c, d))
+    assert store.stats()["evictions"] == 1
+
+
+def test_evicts_beyond_byte_budget_but_keeps_newest(store):
+    old = store.put(b"o" * 600, "Old")
+    new = store.put(b"n" * 600, "New")
+    assert store.resolve(old) is None
+    assert store.resolve(new) is not None
+    assert store.stats()["bytes"] == 600
+
+    huge = store.put(b"h" * 5000, "Huge")  # Over budget on its own: still stored, everything else goes
+    assert store.resolve(huge) is not None
+    assert store.stats()["files"] == 1
+
+
+def test_resolve_rejects_missing_and_unsafe_names(store, tmp_path):
+    assert store.resolve("missing.adg") is None
+    (tmp_path / "folder.adg").mkdir()
+    assert store.resolve("folder.adg") is None
+    for name in ("../main.py", "..%2Fmain.py", "a/b.adg", "rack.txt", ""):
+        assert store.resolve(name) is None
+
+
+def test_resolve_adopts_files_written_after_startup(store, tmp_path):
+    (tmp_path / "stray.adg").write_bytes(b"x" * 7)
+    assert store.resolve("stray.adg") == str(tmp_path / "stray.adg")
+    stats = store.stats()
+    assert (stats["files"], stats["bytes"], stats["adopted"]) == (1, 7, 1)
+
+
+def test_workers_sharing_a_directory_see_each_others_racks(tmp_path):
+    worker_a = RackStore(str(tmp_path), max_files=3, hot_max_bytes=0)
+    worker_b = RackStore(str(tmp_path), max_files=3, hot_max_bytes=0)
+    name = worker_a.put(b"a" * 10, "FromA")
+    assert worker_b.resolve(name) is not None  # /download landing on the other worker
+
+
+def test_budget_holds_across_workers_after_a_rescan(tmp_path):
+    workers = [RackStore(str(tmp_path), max_files=3, scan_interval_s=3600) for _ in range(2)]
+    names = [workers[i % 2].put(bytes([65 + i]) * 10, f"R{i}") for i in range(4)]
+    assert len(os.listdir(tmp_path)) == 4  # Each worker alone is within budget until its next scan
+
+    workers[0]._next_scan = 0  # Scan interval elapsed
+    workers[0].put(b"z" * 10, "Last")  # Rescan: the oldest file of either worker goes
+    assert len(os.listdir(tmp_path)) == 3
+    assert not (tmp_path / names[0]).exists() and not (tmp_path / names[1]).exists()
+    assert workers[1].resolve(names[1]) is None
+
+
+def test_index_is_seeded_from_disk_in_mtime_order(tmp_path):
+    for age, name in ((30, "oldest.adg"), (20, "middle.adg"), (10, "newest.adg")):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 10)
+        os.utime(path, (path.stat().st_atime - age, path.stat().st_mtime - age))
+
+    store = RackStore(str(tmp_path), max_files=2)
+    assert store.resolve("oldest.adg") is None
+    assert not (tmp_path / "oldest.adg").exists()
+    assert store.resolve("newest.adg") is not None
+
+
+def test_file_deleted_behind_the_store_is_forgotten(store, tmp_path):
+    name = store.put(b"z" * 50, "Gone")
+    os.remove(tmp_path / name)
+    assert store.resolve(name) is None
+    assert store.stats()["files"] == 0
+    assert store.stats()["bytes"] == 0
+
+
+def test_hot_tier_serves_recent_racks_within_its_budget(store):
+    a = store.put(b"a" * 100, "A")
+    b = store.put(b"b" * 100, "B")
+    assert store.hot_bytes(a) == b"a" * 100
+    c = store.put(b"c" * 100, "C")  # 300 > 250: least recently used hot entry (b) drops out
+
+    assert store.hot_bytes(b) is None
+    assert store.hot_bytes(c) == b"c" * 100
+    assert store.resolve(b) is not None  # Still on disk
+    stats = store.stats()
+    assert stats["hot_bytes"] <= 250
+    assert stats["hot_hits"] == 2
+
+
+def test_eviction_also_drops_hot_copy(store):
+    names = [store.put(bytes([65 + i]) * 10, f"R{i}") for i in range(4)]
+    assert store.hot_bytes(names[0]) is None
+    assert store.resolve(names[0]) is None
+
+
+def test_etag_uses_content_hash_or_file_identity(store, tmp_path):
+    name = store.put(b"q" * 10, "Etag")
+    assert RackStore.etag(name) == f'"{name[:-4].rsplit("_", 1)[-1]}"'
+
+    legacy = tmp_path / "Legacy_Rack.adg"
+    legacy.write_bytes(b"legacy")
+    tag = RackStore.etag(legacy.name, str(legacy))
+    assert tag.startswith('"6-') and tag == RackStore.etag(legacy.name, str(legacy))
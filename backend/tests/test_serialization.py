@@ -0,0 +1,75 @@
+"""
+Golden test: the streaming serializer must stay byte-identical to the original prettify_xml/save_adg.
+
+fixtures/golden_rack.xml and golden_rack.adg.xml were written by the pre-V66 serializer
+(ET.tostring + ' />' replace, CRLF + gzip in save_adg) for GOLDEN_SPEC below.
+"""
+
+import contextlib
+import gzip
+import io
+import os
+
+import pytest
+
+from core.builder import DEVICE_FRAGMENT_CACHE, AudioEffectRack, Chain, prettify_xml
+from core.rack_factory import default_device_db
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# EQ Eight with touched and blueprint bands, a cacheable Utility, mapped Compressor/Reverb
+GOLDEN_SPEC = {
+    "devices": ["EQ Eight", "Compressor", "Utility", "Reverb"],
+    "surgical_devices": [
+        {"name": "EQ Eight", "parameters": {"Bands.1.Gain": -6.0, "Bands.2.Freq": 300}},
+        {"name": "Reverb", "parameters": {"DryWet": 0.0}},
+    ],
+    "macro_details": [
+        {"macro": 1, "name": "Low Kill", "target_device": "EQ Eight", "target_parameter": "Bands.1.Gain", "min": 0, "max": -15},
+        {"macro": 2, "name": "Squash", "target_device": "Compressor", "target_parameter": "Threshold", "min": 0, "max": -30},
+        {"macro": 3, "name": "Space", "target_device": "Reverb", "target_parameter": "DryWet", "min": 0, "max": 1},
+    ],
+}
+
+
+def build_golden_rack() -> AudioEffectRack:
+    with contextlib.redirect_stdout(io.StringIO()):
+        rack = AudioEffectRack(name="Custom Rack", device_db=default_device_db())
+        chain = Chain(name="Main Chain")
+        for name in GOLDEN_SPEC["devices"]:
+            chain.add_device(rack.create_device(name))
+        rack.add_chain(chain)
+        rack.macro_count = 8
+        rack.auto_map_macros(GOLDEN_SPEC)
+    return rack
+
+
+def fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("fragment_cache", ["cold", "warm"])
+def test_prettify_xml_matches_baseline(fragment_cache):
+    if fragment_cache == "cold":
+        DEVICE_FRAGMENT_CACHE.clear()
+    else:
+        prettify_xml(build_golden_rack().to_xml())
+        hits = DEVICE_FRAGMENT_CACHE.stats()["hits"]
+    xml = prettify_xml(build_golden_rack().to_xml())
+    if fragment_cache == "warm":
+        assert DEVICE_FRAGMENT_CACHE.stats()["hits"] > hits  # Devices spliced in as cached fragments
+    assert xml.encode("utf-8") == fixture("golden_rack.xml")
+
+
+@pytest.mark.parametrize("compression", ["fast", "max"])
+def test_adg_bytes_match_baseline(compression):
+    data = build_golden_rack().to_adg_bytes("Golden_Rack_.adg", compression=compression)
+    assert gzip.decompress(data) == fixture("golden_rack.adg.xml")
+    assert data[3] & 0x08 and data[10:17] == b"Golden\x00"  # FNAME: name up to the first '_'
+
+
+def test_save_matches_to_adg_bytes(tmp_path):
+    path = tmp_path / "Golden_Rack_.adg"
+    build_golden_rack().save(str(path))  # Fresh racks: preset ids advance on every to_xml()
+    assert path.read_bytes() == build_golden_rack().to_adg_bytes("Golden_Rack_.adg")
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from core.single_flight import SingleFlight
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "rack"
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do("key", work) for _ in range(5)])
+
+    assert run(scenario()) == ["rack"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "executions": 1, "coalesced": 4, "cancelled": 0}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def scenario():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0.01, "a")),
+                                    flight.do("b", lambda: asyncio.sleep(0.01, "b")))
+
+    assert run(scenario()) == ["a", "b"]
+    assert flight.executions == 2
+
+
+def test_exception_is_shared_by_all_waiters():
+    flight = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("no devices")
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do("key", boom) for _ in range(3)], return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.executions == 1
+
+
+def test_leader_leaving_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result
+
+    assert run(scenario()) == "done"
+    assert flight.cancelled == 0
+
+
+def test_work_is_cancelled_when_last_waiter_leaves():
+    flight = SingleFlight()
+    state = {}
+
+    async def work():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def scenario():
+        waiters = [asyncio.ensure_future(flight.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)  # Let the cancelled work task unwind
+        # A new caller starts a fresh execution instead of joining the dying one
+        return await flight.do("key", lambda: asyncio.sleep(0, "fresh"))
+
+    assert run(scenario()) == "fresh"
+    assert state == {"cancelled": True}
+    assert flight.cancelled == 1
+    assert flight.executions == 2
+    assert flight.stats()["in_flight"] == 0
@@ -176,7 +176,7 @@ export async function generateRackAction(prompt: string) {
     const res = await fetch(`${backendUrl}/generate`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ prompt }),
+      body: JSON.stringify({ prompt, inline: true }),
     });
 
     if (!res.ok) {
@@ -184,28 +184,38 @@ export async function generateRackAction(prompt: string) {
       throw new Error(err.detail || 'Generation failed');
     }
 
-    const rackData = await res.json();
+    const { adg_base64, ...rackData } = await res.json();
     const filename = rackData.filename;
 
-    // 3. Fetch the actual file content from Python
-    const fileRes = await fetch(`${backendUrl}/download/${filename}`);
-    if (!fileRes.ok) throw new Error("Failed to retrieve generated file");
-    const fileBuffer = await fileRes.arrayBuffer();
+    // 3. File content comes inline with the response; /download is only the fallback
+    let fileBuffer: ArrayBuffer | Buffer;
+    if (adg_base64) {
+      fileBuffer = Buffer.from(adg_base64, 'base64');
+    } else {
+      const fileRes = await fetch(`${backendUrl}/download/${filename}`);
+      if (!fileRes.ok) throw new Error("Failed to retrieve generated file");
+      fileBuffer = await fileRes.arrayBuffer();
+    }
 
     // 4. Upload to Supabase Storage
+    // Filenames are content hashes, so the key is per user: another user's delete never breaks this file_url.
+    // The same user generating the same rack again gets the identical object back.
+    const storagePath = `${user.id}/${filename}`;
     const { error: uploadError } = await supabase.storage
       .from('racks')
-      .upload(filename, fileBuffer, {
+      .upload(storagePath, fileBuffer, {
         contentType: 'application/octet-stream',
         upsert: false
       });
 
-    if (uploadError) throw new Error(`Storage Error: ${uploadError.message}`);
+    if (uploadError && !/already exists/i.test(uploadError.message)) {
+      throw new Error(`Storage Error: ${uploadError.message}`);
+    }
 
     // 5. Get Public URL
     const { data: { publicUrl } } = supabase.storage
       .from('racks')
-      .getPublicUrl(filename);
+      .getPublicUrl(storagePath);
 
     // 6. Save Metadata to DB & Deduct Credit
     // We strive for atomicity but Supabase doesn't support easy multi-table transactions via JS client yet without RPC.
@@ -267,6 +277,13 @@ export async function getUserLibrary() {
   return data;
 }
 
+// Object key inside the 'racks' bucket: '{user_id}/{filename}', or just the filename for older uploads
+function rackStoragePath(gen: { filename: string; file_url?: string | null }) {
+  const marker = '/object/public/racks/';
+  const idx = gen.file_url ? gen.file_url.indexOf(marker) : -1;
+  return idx >= 0 ? decodeURIComponent(gen.file_url!.slice(idx + marker.length)) : gen.filename;
+}
+
 export async function deleteGeneration(id: string) {
   const user = await currentUser();
   if (!user) return { success: false, error: "Unauthorized" };
@@ -280,7 +297,7 @@ export async function deleteGeneration(id: string) {
     // 1. Get the generation record to find the filename
     const { data: gen, error: fetchError } = await supabase
       .from('generations')
-      .select('filename, user_id')
+      .select('filename, user_id, file_url')
       .eq('id', id)
       .single();
 
@@ -289,14 +306,22 @@ export async function deleteGeneration(id: string) {
     // 2. Security: Ensure the user owns this generation
     if (gen.user_id !== user.id) throw new Error("Unauthorized to delete this record");
 
-    // 3. Delete from Supabase Storage
-    const { error: storageError } = await supabase.storage
-      .from('racks')
-      .remove([gen.filename]);
-
-    if (storageError) {
-        console.warn(`Storage Deletion Warning: ${storageError.message}`);
-        // We continue even if storage delete fails (maybe file was already gone)
+    // 3. Delete from Supabase Storage, unless another generation still points at the same object
+    const { count: sharedCount } = await supabase
+      .from('generations')
+      .select('id', { count: 'exact', head: true })
+      .eq('file_url', gen.file_url)
+      .neq('id', id);
+
+    if (!sharedCount) {
+      const { error: storageError } = await supabase.storage
+        .from('racks')
+        .remove([rackStoragePath(gen)]);
+
+      if (storageError) {
+          console.warn(`Storage Deletion Warning: ${storageError.message}`);
+          // We continue even if storage delete fails (maybe file was already gone)
+      }
     }
 
     // 4. Delete from Database
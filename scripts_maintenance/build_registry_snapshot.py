@@ -0,0 +1,17 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from core.device_mapper import DeviceDatabase
+
+def build_snapshot():
+    # Precompile the registry at deploy time so no worker pays the
+    # full per-file JSON parse on its first cold start.
+    db = DeviceDatabase()
+    version = db.rebuild_snapshot()
+    print(f"Registry snapshot rebuilt: {db.device_count()} devices (version {version})")
+    print(f"Written to: {os.path.abspath(db.snapshot_path)}")
+
+if __name__ == "__main__":
+    build_snapshot()
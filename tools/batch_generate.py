@@ -0,0 +1,88 @@
+"""
+Batch rack generation from the command line (client of POST /generate/batch)
+
+    python tools/batch_generate.py prompts.txt -o generated_pack
+    python tools/batch_generate.py -p "dark techno bus" -p "lofi vocal chain" --macros 16
+
+prompts.txt: one prompt per line, blank lines and lines starting with '#' are skipped.
+Racks are written as they finish; the exit code is 1 if any prompt failed.
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def read_prompts(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many .adg racks through /generate/batch")
+    parser.add_argument("file", nargs="?", help="Text file with one prompt per line")
+    parser.add_argument("-p", "--prompt", action="append", default=[], help="Prompt (repeatable)")
+    parser.add_argument("-o", "--out", default="batch_output", help="Output directory for .adg files")
+    parser.add_argument("--backend", default=os.getenv("BACKEND_URL", "http://localhost:8000"))
+    parser.add_argument("--macros", type=int, default=8, help="Macro count per rack")
+    parser.add_argument("--deadline", type=float, default=None, help="Parse deadline per prompt (seconds)")
+    args = parser.parse_args()
+
+    prompts = (read_prompts(args.file) if args.file else []) + args.prompt
+    if not prompts:
+        parser.error("no prompts given (file or --prompt)")
+    os.makedirs(args.out, exist_ok=True)
+
+    body = json.dumps({
+        "prompts": prompts,
+        "macro_count": args.macros,
+        "deadline_s": args.deadline,
+        "inline": True,
+    }).encode("utf-8")
+    req = urllib.request.Request(
+        f"{args.backend.rstrip('/')}/generate/batch",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+
+    print(f"--- BATCH: {len(prompts)} prompts -> {args.out} ---")
+    started = time.time()
+    failed = 0
+    try:
+        with urllib.request.urlopen(req) as res:
+            for raw in res:  # NDJSON: one result per line, in completion order
+                if not raw.strip():
+                    continue
+                item = json.loads(raw)
+                if "summary" in item:
+                    summary = item["summary"]
+                    print(f"--- DONE: {summary['ok']} ok, {summary['failed']} failed, {summary['elapsed_s']}s ---")
+                    continue
+                label = f"[{item['index'] + 1}/{len(prompts)}]"
+                if item["status"] != "ok":
+                    failed += 1
+                    print(f"{label} FAILED ({item.get('status_code')}): {item['prompt']} -> {item.get('detail')}")
+                    continue
+                rack = item["rack"]
+                with open(os.path.join(args.out, rack["filename"]), "wb") as f:
+                    f.write(base64.b64decode(rack["adg_base64"]))
+                print(f"{label} {rack['filename']} ({len(rack['devices'])} devices) <- {item['prompt']}")
+    except urllib.error.HTTPError as e:
+        print(f"ERROR: {e.code} {e.read().decode('utf-8', 'replace')}")
+        return 1
+    except urllib.error.URLError as e:
+        print(f"ERROR: backend not reachable at {args.backend}: {e.reason}")
+        return 1
+
+    print(f"Total wall time: {time.time() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import gzip
+import io
+import os
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(BASE_DIR, "backend"))
+
+from core.builder import AudioEffectRack, Chain, COMPRESSION_PROFILES, prettify_xml, resolve_compresslevel
+from core.device_mapper import DeviceDatabase
+
+SHOWCASE_DIR = os.path.join(BASE_DIR, "frontend", "public", "showcase")
+RUNS = 15
+
+# Representative generated racks (no LLM needed): small, mastering, big sound design
+SAMPLE_SPECS = {
+    "Basic (Comp+EQ)": {
+        "devices": ["Compressor", "EQ Eight"],
+        "macro_details": [
+            {"macro": 1, "name": "Squash", "target_device": "Compressor", "target_parameter": "Threshold"},
+        ],
+    },
+    "Mastering Chain": {
+        "devices": ["EQ Eight", "Glue Compressor", "Saturator", "Utility", "Limiter"],
+        "macro_details": [
+            {"macro": 1, "name": "Low Kill", "target_device": "EQ Eight", "target_parameter": "Bands.1.Gain", "min": 0, "max": -15},
+            {"macro": 2, "name": "Glue", "target_device": "Glue Compressor", "target_parameter": "thresh"},
+            {"macro": 3, "name": "Heat", "target_device": "Saturator", "target_parameter": "Drive"},
+            {"macro": 4, "name": "Width", "target_device": "Utility", "target_parameter": "StereoWidth"},
+        ],
+    },
+    "Sound Design (12 devices)": {
+        "devices": ["EQ Eight", "Auto Filter", "Roar", "Chorus-Ensemble", "Phaser-Flanger", "Beat Repeat",
+                    "Grain Delay", "Echo", "Spectral Resonator", "Hybrid Reverb", "Utility", "Limiter"],
+        "macro_details": [
+            {"macro": 1, "name": "Sweep", "target_device": "Auto Filter", "target_parameter": "Filter_Frequency"},
+            {"macro": 2, "name": "Grit", "target_device": "Roar", "target_parameter": "drive"},
+            {"macro": 3, "name": "Wobble", "target_device": "Chorus-Ensemble", "target_parameter": "rate"},
+            {"macro": 4, "name": "Stutter", "target_device": "Beat Repeat", "target_parameter": "chance"},
+            {"macro": 5, "name": "Spray", "target_device": "Grain Delay", "target_parameter": "Spray"},
+            {"macro": 6, "name": "Shine", "target_device": "Spectral Resonator", "target_parameter": "frequency"},
+            {"macro": 7, "name": "Space", "target_device": "Hybrid Reverb", "target_parameter": "Decay"},
+            {"macro": 8, "name": "Echoes", "target_device": "Echo", "target_parameter": "Feedback"},
+        ],
+    },
+}
+
+def build_sample_payloads():
+    """Serialize the sample specs exactly like AudioEffectRack.save does (before gzip)"""
+    payloads = {}
+    with redirect_stdout(io.StringIO()):
+        db = DeviceDatabase()
+        for label, spec in SAMPLE_SPECS.items():
+            rack = AudioEffectRack(name=label, device_db=db)
+            chain = Chain(name="Main Chain")
+            for d_name in spec["devices"]:
+                chain.add_device(rack.create_device(d_name))
+            rack.add_chain(chain)
+            rack.auto_map_macros(spec)
+            xml_string = prettify_xml(rack.to_xml()).replace('\n', '\r\n')
+            payloads[label] = xml_string.encode('utf-8')
+    return payloads
+
+def load_adg_payloads(paths):
+    payloads = {}
+    for path in paths:
+        with gzip.open(path, 'rb') as f:
+            payloads[os.path.basename(path)] = f.read()
+    return payloads
+
+def benchmark(payloads, runs=RUNS):
+    print(f"{'Rack':<28} {'XML':>9} " + " ".join(f"{p + ' (L' + str(l) + ')':>24}" for p, l in COMPRESSION_PROFILES.items()))
+    print(f"{'':<28} {'bytes':>9} " + " ".join(f"{'bytes / ms (p50)':>24}" for _ in COMPRESSION_PROFILES))
+    totals = {p: [0, 0.0] for p in COMPRESSION_PROFILES}
+    for label, data in payloads.items():
+        cells = []
+        for profile in COMPRESSION_PROFILES:
+            level = resolve_compresslevel(profile)
+            timings = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                out = gzip.compress(data, compresslevel=level, mtime=0)
+                timings.append((time.perf_counter() - t0) * 1000.0)
+            p50 = statistics.median(timings)
+            totals[profile][0] += len(out); totals[profile][1] += p50
+            cells.append(f"{len(out):>12,} / {p50:>7.2f}ms")
+        print(f"{label[:28]:<28} {len(data):>9,} " + " ".join(f"{c:>24}" for c in cells))
+    print("-" * (39 + 25 * len(COMPRESSION_PROFILES)))
+    print(f"{'TOTAL':<28} {sum(len(d) for d in payloads.values()):>9,} " +
+          " ".join(f"{totals[p][0]:>12,} / {totals[p][1]:>7.2f}ms" for p in COMPRESSION_PROFILES))
+
+if __name__ == "__main__":
+    # Usage: python tools/benchmark_compression.py [file.adg ...]
+    # Without arguments: sample generated racks + the frontend showcase racks.
+    adg_paths = sys.argv[1:]
+    if not adg_paths and os.path.isdir(SHOWCASE_DIR):
+        adg_paths = sorted(os.path.join(SHOWCASE_DIR, f) for f in os.listdir(SHOWCASE_DIR) if f.endswith(".adg"))
+    payloads = build_sample_payloads() if not sys.argv[1:] else {}
+    payloads.update(load_adg_payloads(adg_paths))
+    benchmark(payloads)